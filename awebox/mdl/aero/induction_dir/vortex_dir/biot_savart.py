@@ -30,11 +30,15 @@ _python-3.5 / casadi-3.4.5
 
 import casadi.tools as cas
 import numpy as np
+from functools import lru_cache
 
 import awebox.tools.vector_operations as vect_op
 import awebox.mdl.aero.induction_dir.general_dir.geom as general_geom
 from awebox.logger.logger import Logger as awelogger
 
+# smoothing of the segment lengths, shared by the casadi and numpy kernels
+norm_smoothing_epsilon = 1e-8
+
 
 def get_biot_savart_segment_list(filament_list, options, variables, kite, parent, include_normal_info):
 
@@ -44,17 +48,12 @@ def get_biot_savart_segment_list(filament_list, options, variables, kite, parent
     point_obs = variables['xd']['q' + str(kite) + str(parent)]
     epsilon = options['aero']['vortex']['epsilon']
 
-    point_obs_extended = []
-    for jdx in range(3):
-        point_obs_extended = cas.vertcat(point_obs_extended, vect_op.ones_sx((1, n_filaments)) * point_obs[jdx])
+    point_obs_extended = cas.repmat(point_obs, 1, n_filaments)
     eps_extended = vect_op.ones_sx((1, n_filaments)) * epsilon
 
     if include_normal_info:
         n_hat = general_geom.get_n_hat_var(variables, parent)
-
-        n_hat_ext = []
-        for jdx in range(3):
-            n_hat_ext = cas.vertcat(n_hat_ext, vect_op.ones_sx((1, n_filaments)) * n_hat[jdx])
+        n_hat_ext = cas.repmat(n_hat, 1, n_filaments)
 
         segment_list = cas.vertcat(point_obs_extended, filament_list, eps_extended, n_hat_ext)
     else:
@@ -65,37 +64,100 @@ def get_biot_savart_segment_list(filament_list, options, variables, kite, parent
 
 
 def filament(seg_data):
+    # seg_data is (11 x n_filaments), with one filament per column:
+    # rows [0:3] observation point, [3:6] start point, [6:9] end point, [9] strength, [10] epsilon
+
+    point_obs = seg_data[0:3, :]
+    point_1 = seg_data[3:6, :]
+    point_2 = seg_data[6:9, :]
+    Gamma = seg_data[9, :]
+    epsilon = seg_data[10, :]
+
+    vec_1 = point_obs - point_1
+    vec_2 = point_obs - point_2
+    vec_0 = point_2 - point_1
+
+    r1 = columnwise_smooth_norm(vec_1)
+    r2 = columnwise_smooth_norm(vec_2)
+
+    # only the square of r0 is needed, so skip its square root
+    r0_squared = columnwise_smooth_norm_squared(vec_0)
+
+    factor = Gamma / (4. * np.pi)
+
+    num = (r1 + r2)
 
-    point_obs = seg_data[:3]
-    point_1 = seg_data[3:6]
-    point_2 = seg_data[6:9]
-    Gamma = seg_data[9]
-    epsilon = seg_data[10]
+    r1r2 = r1 * r2
+    den_ori = r1r2 * (r1r2 + cas.sum1(vec_1 * vec_2))
+    den_reg = epsilon ** 2. * r0_squared
+    den = den_ori + den_reg
+
+    dir = cas.cross(vec_1, vec_2, 1)
+    scale = factor * num / den
+
+    sol = dir * cas.repmat(scale, 3, 1)
+
+    return sol
+
+def filament_np(seg_data):
+    # numerical counterpart of filament, for evaluating many segments (11 x n_filaments ndarray) without casadi
+
+    seg_data = np.asarray(seg_data, dtype=float)
+
+    point_obs = seg_data[0:3, :]
+    point_1 = seg_data[3:6, :]
+    point_2 = seg_data[6:9, :]
+    Gamma = seg_data[9, :]
+    epsilon = seg_data[10, :]
 
     vec_1 = point_obs - point_1
     vec_2 = point_obs - point_2
     vec_0 = point_2 - point_1
 
-    r1 = vect_op.smooth_norm(vec_1)
-    r2 = vect_op.smooth_norm(vec_2)
-    r0 = vect_op.smooth_norm(vec_0)
+    smoothing = norm_smoothing_epsilon ** 2.
+    r1 = np.sqrt(np.sum(vec_1 * vec_1, axis=0) + smoothing)
+    r2 = np.sqrt(np.sum(vec_2 * vec_2, axis=0) + smoothing)
+    r0_squared = np.sum(vec_0 * vec_0, axis=0) + smoothing
 
     factor = Gamma / (4. * np.pi)
 
     num = (r1 + r2)
 
-    den_ori = (r1 * r2) * (r1 * r2 + cas.mtimes(vec_1.T, vec_2))
-    den_reg = (epsilon * r0) ** 2.
+    r1r2 = r1 * r2
+    den_ori = r1r2 * (r1r2 + np.sum(vec_1 * vec_2, axis=0))
+    den_reg = epsilon ** 2. * r0_squared
     den = den_ori + den_reg
 
-    dir = vect_op.cross(vec_1, vec_2)
+    dir = np.cross(vec_1, vec_2, axis=0)
     scale = factor * num / den
 
     sol = dir * scale
 
     return sol
 
+@lru_cache(maxsize=None)
+def get_filament_fun(n_symbolics, n_filaments, jit=False, compiler='clang'):
+    # the kernel function only depends on the shape of the segment list, so build it once per shape
+
+    seg_data_sym = cas.SX.sym('seg_data_sym', (n_symbolics, n_filaments))
+    filament_sym = filament(seg_data_sym)
+
+    if jit:
+        opts = {'jit': True, 'compiler': compiler, 'jit_options': {'flags': ['-O3']}}
+    else:
+        opts = {}
+
+    filament_fun = cas.Function('filament_fun', [seg_data_sym], [filament_sym], opts)
 
+    return filament_fun
+
+def columnwise_smooth_norm_squared(vecs, epsilon=norm_smoothing_epsilon):
+    norm_squared = cas.sum1(vecs * vecs) + epsilon ** 2.
+    return norm_squared
+
+def columnwise_smooth_norm(vecs, epsilon=norm_smoothing_epsilon):
+    norm = columnwise_smooth_norm_squared(vecs, epsilon) ** 0.5
+    return norm
 
 
 def test_filament():
@@ -119,3 +181,60 @@ def test_filament():
         awelogger.logger.error('biot-savart filament induction test gives error of size: ' + str(resi))
 
     return None
+
+def test_filament_against_quadrature():
+    # the filament kernel is the closed-form biot-savart integral over a straight segment,
+    # so it should agree with a high-order quadrature of the line integral
+
+    point_obs = np.array([0.3, 1.2, -0.4])
+    point_1 = np.array([-1., 0.2, 0.5])
+    point_2 = np.array([2., -0.3, 1.5])
+    Gamma = 1.
+    epsilon = 0.
+    seg_data = cas.vertcat(point_obs, point_1, point_2, Gamma, epsilon)
+
+    vec_found = np.array(filament(seg_data)).flatten()
+
+    nodes, weights = np.polynomial.legendre.leggauss(40)
+    vec_0 = point_2 - point_1
+
+    vec_quad = np.zeros(3)
+    for node, weight in zip(nodes, weights):
+        point = point_1 + (node + 1.) / 2. * vec_0
+        vec_r = point_obs - point
+        integrand = np.cross(vec_0, vec_r) / np.linalg.norm(vec_r) ** 3.
+        vec_quad = vec_quad + weight / 2. * integrand
+    vec_quad = Gamma / (4. * np.pi) * vec_quad
+
+    difference = vec_found - vec_quad
+    resi = np.dot(difference, difference)
+
+    epsilon = 1.e-12
+    if resi > epsilon:
+        awelogger.logger.error('biot-savart filament quadrature test gives error of size: ' + str(resi))
+
+    assert resi < epsilon
+
+    return None
+
+def test_filament_np():
+    # the numerical kernel should reproduce the symbolic kernel on a batch of segments
+
+    random_state = np.random.RandomState(0)
+    n_filaments = 20
+    seg_data = random_state.randn(11, n_filaments)
+    seg_data[10, :] = 1.e-2
+
+    vec_found = filament_np(seg_data)
+    vec_ref = np.array(filament(cas.DM(seg_data)))
+
+    difference = vec_found - vec_ref
+    resi = np.max(np.abs(difference))
+
+    epsilon = 1.e-10
+    if resi > epsilon:
+        awelogger.logger.error('numerical biot-savart filament test gives error of size: ' + str(resi))
+
+    assert resi < epsilon
+
+    return None
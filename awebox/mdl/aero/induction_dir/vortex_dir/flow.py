@@ -153,17 +153,17 @@ def get_residual_at_kite_from_kite_and_ring(options, variables, wind, kite_obs,
 
 
 def get_induced_velocity_at_kite_from_kite_and_ring(options, variables, wind, kite_obs, parent, kite, rdx):
-    filament_list = vortex_tools.get_list_of_filaments_by_kite_and_ring(options, variables, wind, kite, parent, rdx).T
+    filament_list = vortex_tools.get_list_of_filaments_by_kite_and_ring(options, variables, wind, kite, parent, rdx)
 
     include_normal_info = False
     segment_list = biot_savart.get_biot_savart_segment_list(filament_list, options, variables, kite_obs, parent,
                                                 include_normal_info)
 
-    # define the symbolic function
-    n_symbolics = segment_list.shape[0]
-    seg_data_sym = cas.SX.sym('seg_data_sym', (n_symbolics, 1))
-    filament_sym = biot_savart.filament(seg_data_sym)
-    filament_fun = cas.Function('filament_fun', [seg_data_sym], [filament_sym])
+    # get the (cached) vectorized biot-savart kernel for this segment shape
+    n_symbolics, n_filaments = segment_list.shape
+    jit = options['jit_code_gen']['include']
+    compiler = options['jit_code_gen']['compiler']
+    filament_fun = biot_savart.get_filament_fun(n_symbolics, n_filaments, jit, compiler)
 
     # evaluate the symbolic function
     total_u_vec_ind = vortex_tools.evaluate_symbolic_on_segments_and_sum(filament_fun, segment_list)
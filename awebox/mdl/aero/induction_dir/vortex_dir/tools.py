@@ -29,6 +29,8 @@ _python-3.5 / casadi-3.4.5
 '''
 
 import casadi.tools as cas
+import numpy as np
+from functools import lru_cache
 from awebox.logger.logger import Logger as awelogger
 import awebox.tools.vector_operations as vect_op
 
@@ -62,24 +64,25 @@ def get_vector_var(options, variables, pos_vel, tip, period, kite, architecture,
     loc = 'xd'
     dims = ['x', 'y', 'z']
 
-    if pos_vel == 'pos':
-        sym = 'w'
-    elif pos_vel == 'vel':
-        sym = 'dw'
-    else:
+    sym = {'pos': 'w', 'vel': 'dw'}.get(pos_vel)
+    if sym is None:
         awelogger.logger.error('Unknown vector type. Please choose either pos (position) or vel (velocity).')
 
-    vect = []
+    variables_loc = variables[loc]
+    known_names = variables_loc.keys()
+
+    components = []
     for dim in dims:
         name = sym + dim + '_' + tip + '_' + str(period) + '_' + str(kite) + str(parent)
 
-        try:
-            comp_all = variables[loc][name]
-        except:
-            awelogger.logger.error('No such variable known.')
+        if name not in known_names:
+            awelogger.logger.error('No such variable known: ' + name)
 
+        comp_all = variables_loc[name]
         comp = get_wake_var_at_ndx_ddx(n_k, d, comp_all, start=start, ndx=ndx, ddx=ddx)
-        vect = cas.vertcat(vect, comp)
+        components.append(comp)
+
+    vect = cas.vertcat(*components)
 
     return vect
 
@@ -103,16 +106,25 @@ def get_vel_wake_var(options, variables, tip, period, kite, architecture, start=
 
 
 
-def get_time_ordered_wake_var_without_start(n_k, d, var):
-    dimensions = (n_k, d)
+@lru_cache(maxsize=None)
+def get_time_ordering_permutation(n_k, d, offset=0):
+    # indices that put the (n_k, d) column-major wake entries into time order, oldest behind.
+    # this only depends on the discretization, so it is computed once and reused as one gather.
     n_regular = n_k * d
 
-    var_regular = var[1:]
-    var_reshape = cas.reshape(var_regular, dimensions)
-    time_ordered = cas.reshape(var_reshape.T, (n_regular, 1))
+    regular = np.arange(offset, offset + n_regular)
+    var_reshape = np.reshape(regular, (n_k, d), order='F')
+    time_ordered = np.reshape(var_reshape, (n_regular,))
 
     oldest_behind = time_ordered[::-1]
 
+    return tuple(int(idx) for idx in oldest_behind)
+
+
+def get_time_ordered_wake_var_without_start(n_k, d, var):
+    permutation = get_time_ordering_permutation(n_k, d, offset=1)
+    oldest_behind = var[list(permutation)]
+
     return oldest_behind
 
 
@@ -126,14 +138,8 @@ def get_time_ordered_wake_var_with_start(n_k, d, var):
 
 
 def get_time_ordered_strength(n_k, d, var):
-    dimensions = (n_k, d)
-    n_regular = n_k * d
-
-    var_regular = var
-    var_reshape = cas.reshape(var_regular, dimensions)
-    time_ordered = cas.reshape(var_reshape.T, (n_regular, 1))
-
-    oldest_behind = time_ordered[::-1]
+    permutation = get_time_ordering_permutation(n_k, d)
+    oldest_behind = var[list(permutation)]
 
     return oldest_behind
 
@@ -149,31 +155,44 @@ def get_all_time_ordered_points_by_kite_and_tip(variables_xd, n_k, d, periods_tr
             var_name = 'w' + dim + '_' + tip + '_' + str(period) + '_' + str(kite) + str(parent)
             var = variables_xd[var_name]
             var_ordered = get_time_ordered_wake_var_without_start(n_k, d, var)
-            all_ordered = cas.vertcat(all_ordered, var_ordered)
+            all_ordered.append(var_ordered)
 
         period = periods_tracked - 1
         var_name = 'w' + dim + '_' + tip + '_' + str(period) + '_' + str(kite) + str(parent)
         var = variables_xd[var_name]
         var_ordered = get_time_ordered_wake_var_with_start(n_k, d, var)
-        all_ordered = cas.vertcat(all_ordered, var_ordered)
+        all_ordered.append(var_ordered)
 
-        all_dims = cas.horzcat(all_dims, all_ordered)
+        all_dims.append(cas.vertcat(*all_ordered))
 
-    return all_dims
+    return cas.horzcat(*all_dims)
 
-def get_padded_points_by_kite_and_tip(variables_xd, n_k, d, periods_tracked, kite, parent, tip, u_vec_ref, infinite_time):
+def get_wake_points_by_kite_and_tip(variables_xd, n_k, d, periods_tracked, kite, parent, tip, u_vec_ref, infinite_time):
+    # the rings start at rdx = 1, so only the trailing end of the wake needs an infinite point.
+    # the padding is not stacked onto the regular points: the ring construction indexes into both.
 
     regular = get_all_time_ordered_points_by_kite_and_tip(variables_xd, n_k, d, periods_tracked, kite, parent, tip)
 
-    leading = regular[0, :]
     trailing = regular[-1, :]
-
-    infinite_leading = leading + infinite_time * (-1.) * u_vec_ref.T
     infinite_trailing = trailing + infinite_time * u_vec_ref.T
 
-    padded = cas.vertcat(infinite_leading, regular, infinite_trailing)
+    wake_points = {'regular': regular, 'infinite_trailing': infinite_trailing}
+
+    return wake_points
 
-    return padded
+
+def get_wake_point_rows(wake_points, pdx_start, pdx_end):
+    # rows pdx_start <= pdx < pdx_end of the (virtual) padded point list, where pdx = 0 would be the infinite
+    # leading point, 1 <= pdx <= n_regular are the regular points, and pdx = n_regular + 1 is the infinite trailing point
+    regular = wake_points['regular']
+    n_regular = regular.shape[0]
+
+    if pdx_end <= n_regular + 1:
+        rows = regular[pdx_start - 1:pdx_end - 1, :]
+    else:
+        rows = cas.vertcat(regular[pdx_start - 1:, :], wake_points['infinite_trailing'])
+
+    return rows
 
 
 def get_all_time_ordered_strengths_by_kite(variables_xl, n_k, d, periods_tracked, kite, parent):
@@ -183,62 +202,77 @@ def get_all_time_ordered_strengths_by_kite(variables_xl, n_k, d, periods_tracked
         var_name = 'wg' + '_' + str(period) + '_' + str(kite) + str(parent)
         var = variables_xl[var_name]
         var_ordered = get_time_ordered_strength(n_k, d, var)
-        all_ordered = cas.vertcat(all_ordered, var_ordered)
+        all_ordered.append(var_ordered)
 
-    return all_ordered
+    return cas.vertcat(*all_ordered)
 
 def get_padded_strengths_by_kite(variables_xl, n_k, d, periods_tracked, kite, parent):
     regular = get_all_time_ordered_strengths_by_kite(variables_xl, n_k, d, periods_tracked, kite, parent)
 
+    # only padded at the trailing end: the ring in front of the first ring has zero strength,
+    # which get_vortex_rings_filaments accounts for directly. entry sdx belongs to ring rdx = sdx + 1.
     trailing = regular[-1]
-
-    infinite_leading = cas.DM(0)
     infinite_trailing = trailing
 
-    padded = cas.vertcat(infinite_leading, regular, infinite_trailing)
+    padded = cas.vertcat(regular, infinite_trailing)
 
     return padded
 
 
-def get_vortex_ring_filaments(padded_strengths, padded_points_ext, padded_points_int, rdx):
+def get_vortex_ring_filaments(padded_strengths, wake_points_ext, wake_points_int, rdx):
+    ring_list = get_vortex_rings_filaments(padded_strengths, wake_points_ext, wake_points_int, rdx, rdx + 1)
+    return ring_list
 
-    points = {}
-    points['int_trailing'] = padded_points_int[rdx + 1, :]
-    points['int_leading'] = padded_points_int[rdx, :]
-    points['ext_leading'] = padded_points_ext[rdx, :]
-    points['ext_trailing'] = padded_points_ext[rdx + 1, :]
 
-    strength_leading = padded_strengths[rdx]
-    strength_trailing = padded_strengths[rdx - 1]
+def get_vortex_rings_filaments(padded_strengths, wake_points_ext, wake_points_int, rdx_start, rdx_end):
+    # builds the filaments of all rings rdx_start <= rdx < rdx_end at once, by slicing instead of looping
 
-    ring_list = []
+    points = {}
+    points['int_trailing'] = get_wake_point_rows(wake_points_int, rdx_start + 1, rdx_end + 1)
+    points['int_leading'] = get_wake_point_rows(wake_points_int, rdx_start, rdx_end)
+    points['ext_leading'] = get_wake_point_rows(wake_points_ext, rdx_start, rdx_end)
+    points['ext_trailing'] = get_wake_point_rows(wake_points_ext, rdx_start + 1, rdx_end + 1)
+
+    strength_leading = padded_strengths[rdx_start - 1:rdx_end - 1]
+    if rdx_start > 1:
+        strength_difference = strength_leading - padded_strengths[rdx_start - 2:rdx_end - 2]
+    else:
+        # the first ring has no ring in front of it, so its leading segment keeps the full strength
+        strength_difference = padded_strengths[0]
+        if rdx_end > 2:
+            later_differences = padded_strengths[1:rdx_end - 1] - padded_strengths[0:rdx_end - 2]
+            strength_difference = cas.vertcat(strength_difference, later_differences)
 
-    ## vortex segment
+    ## vortex segments
     # from: interior, trailing point
     # to: interior, leading point
     start_point = points['int_trailing']
     end_point = points['int_leading']
     strength = strength_leading
-    new_vortex = cas.horzcat(start_point, end_point, strength)
-    ring_list = cas.vertcat(ring_list, new_vortex)
+    vortices_a = cas.horzcat(start_point, end_point, strength)
 
-    ## vortex segment
+    ## vortex segments
     # from: interior, leading point
     # to: exterior, leading point
     start_point = points['int_leading']
     end_point = points['ext_leading']
-    strength = strength_leading - strength_trailing
-    new_vortex = cas.horzcat(start_point, end_point, strength)
-    ring_list = cas.vertcat(ring_list, new_vortex)
+    strength = strength_difference
+    vortices_b = cas.horzcat(start_point, end_point, strength)
 
-    ## vortex segment
+    ## vortex segments
     # from: exterior, leading point
     # to: exterior, trailing point
     start_point = points['ext_leading']
     end_point = points['ext_trailing']
     strength = strength_leading
-    new_vortex = cas.horzcat(start_point, end_point, strength)
-    ring_list = cas.vertcat(ring_list, new_vortex)
+    vortices_c = cas.horzcat(start_point, end_point, strength)
+
+    # lay out one filament per column (start point, end point, strength), which is the layout the biot-savart
+    # segment list uses, and interleave so that the three filaments of each ring stay next to each other
+    n_rings = rdx_end - rdx_start
+    n_entries = vortices_a.shape[1]
+    stacked = cas.vertcat(vortices_a.T, vortices_b.T, vortices_c.T)
+    ring_list = cas.reshape(stacked, (n_entries, 3 * n_rings))
 
     return ring_list
 
@@ -249,32 +283,65 @@ def get_number_of_rings_per_kite(n_k, d, periods_tracked):
     return n_rings
 
 
-def get_list_of_filaments_by_kite(args):
+def get_list_of_filaments_by_kite(variables_xd, variables_xl, u_vec_ref, infinite_time, periods_tracked, n_k, d, kite, parent):
 
-    variables_xd = args['variables_xd']
-    variables_xl = args['variables_xl']
-    u_vec_ref = args['u_vec_ref']
-    infinite_time = args['infinite_time']
-    periods_tracked = args['periods_tracked']
-    n_k = args['n_k']
-    d = args['d']
-    kite = args['kite']
-    parent = args['parent']
+    xd_names, xl_names = get_wake_variable_names_by_kite(periods_tracked, kite, parent)
+    wake_xd = cas.vertcat(*[variables_xd[name] for name in xd_names])
+    wake_xl = cas.vertcat(*[variables_xl[name] for name in xl_names])
 
-    filaments = []
+    filaments_fun = get_filaments_by_kite_fun(n_k, d, periods_tracked, kite, parent, infinite_time)
+    filaments = filaments_fun(wake_xd, wake_xl, u_vec_ref)
 
-    padded_strengths = get_padded_strengths_by_kite(variables_xl, n_k, d, periods_tracked, kite, parent)
-    padded_points_int = get_padded_points_by_kite_and_tip(variables_xd, n_k, d, periods_tracked, kite, parent, 'int',
-                                                          u_vec_ref, infinite_time)
-    padded_points_ext = get_padded_points_by_kite_and_tip(variables_xd, n_k, d, periods_tracked, kite, parent, 'ext',
-                                                          u_vec_ref, infinite_time)
+    return filaments
 
-    n_rings = padded_strengths.shape[0]
-    for rdx in range(1, n_rings):
-        ring_filaments = get_vortex_ring_filaments(padded_strengths, padded_points_ext, padded_points_int, rdx)
-        filaments = cas.vertcat(filaments, ring_filaments)
 
-    return filaments
+def get_wake_variable_names_by_kite(periods_tracked, kite, parent):
+
+    xd_names = []
+    for tip in ['int', 'ext']:
+        for dim in ['x', 'y', 'z']:
+            for period in range(periods_tracked):
+                xd_names.append('w' + dim + '_' + tip + '_' + str(period) + '_' + str(kite) + str(parent))
+
+    xl_names = []
+    for period in range(periods_tracked):
+        xl_names.append('wg' + '_' + str(period) + '_' + str(kite) + str(parent))
+
+    return xd_names, xl_names
+
+
+@lru_cache(maxsize=None)
+def get_filaments_by_kite_fun(n_k, d, periods_tracked, kite, parent, infinite_time):
+    # the filament construction is purely structural (time-ordering, padding and concatenation) for a given
+    # discretization, so it is built once as a function of the raw wake variables and reused at every call.
+
+    xd_names, xl_names = get_wake_variable_names_by_kite(periods_tracked, kite, parent)
+
+    variables_xd_sym = {}
+    for name in xd_names:
+        variables_xd_sym[name] = cas.SX.sym(name, (n_k * d + 1, 1))
+
+    variables_xl_sym = {}
+    for name in xl_names:
+        variables_xl_sym[name] = cas.SX.sym(name, (n_k * d, 1))
+
+    u_vec_ref_sym = cas.SX.sym('u_vec_ref_sym', (3, 1))
+
+    padded_strengths = get_padded_strengths_by_kite(variables_xl_sym, n_k, d, periods_tracked, kite, parent)
+    wake_points_int = get_wake_points_by_kite_and_tip(variables_xd_sym, n_k, d, periods_tracked, kite, parent, 'int',
+                                                     u_vec_ref_sym, infinite_time)
+    wake_points_ext = get_wake_points_by_kite_and_tip(variables_xd_sym, n_k, d, periods_tracked, kite, parent, 'ext',
+                                                     u_vec_ref_sym, infinite_time)
+
+    n_rings = get_number_of_rings_per_kite(n_k, d, periods_tracked)
+    filaments = get_vortex_rings_filaments(padded_strengths, wake_points_ext, wake_points_int, 1, n_rings)
+
+    wake_xd_sym = cas.vertcat(*[variables_xd_sym[name] for name in xd_names])
+    wake_xl_sym = cas.vertcat(*[variables_xl_sym[name] for name in xl_names])
+
+    filaments_fun = cas.Function('filaments_by_kite_fun', [wake_xd_sym, wake_xl_sym, u_vec_ref_sym], [filaments])
+
+    return filaments_fun
 
 
 def get_list_of_all_filaments(variables_xd, variables_xl, architecture, u_vec_ref, periods_tracked, n_k, d):
@@ -284,27 +351,16 @@ def get_list_of_all_filaments(variables_xd, variables_xl, architecture, u_vec_re
 
     infinite_time = 1000.
 
-    args = {}
-    args['variables_xd'] = variables_xd
-    args['variables_xl'] = variables_xl
-    args['u_vec_ref'] = u_vec_ref
-    args['infinite_time'] = infinite_time
-    args['periods_tracked'] = periods_tracked
-    args['n_k'] = n_k
-    args['d'] = d
-
     filaments = []
 
     for kite in kite_nodes:
         parent = parent_map[kite]
 
-        args['kite'] = kite
-        args['parent'] = parent
-
-        new_filaments = get_list_of_filaments_by_kite(args)
-        filaments = cas.vertcat(filaments, new_filaments)
+        new_filaments = get_list_of_filaments_by_kite(variables_xd, variables_xl, u_vec_ref, infinite_time,
+                                                      periods_tracked, n_k, d, kite, parent)
+        filaments.append(new_filaments)
 
-    horz_filaments = filaments.T
+    horz_filaments = cas.horzcat(*filaments)
 
     return horz_filaments
 
@@ -333,14 +389,14 @@ def get_list_of_filaments_by_kite_and_ring(options, variables, wind, kite, paren
     infinite_time = 1000.
 
     padded_strengths = get_padded_strengths_by_kite(variables_xl, n_k, d, periods_tracked, kite, parent)
-    padded_points_int = get_padded_points_by_kite_and_tip(variables_xd, n_k, d, periods_tracked, kite, parent,
+    wake_points_int = get_wake_points_by_kite_and_tip(variables_xd, n_k, d, periods_tracked, kite, parent,
                                                                 'int',
                                                                 u_vec_ref, infinite_time)
-    padded_points_ext = get_padded_points_by_kite_and_tip(variables_xd, n_k, d, periods_tracked, kite, parent,
+    wake_points_ext = get_wake_points_by_kite_and_tip(variables_xd, n_k, d, periods_tracked, kite, parent,
                                                                 'ext',
                                                                 u_vec_ref, infinite_time)
 
-    ring_filaments = get_vortex_ring_filaments(padded_strengths, padded_points_ext, padded_points_int, rdx)
+    ring_filaments = get_vortex_ring_filaments(padded_strengths, wake_points_ext, wake_points_int, rdx)
 
     return ring_filaments
 
@@ -350,9 +406,8 @@ def get_list_of_filaments_by_kite_and_ring(options, variables, wind, kite, paren
 
 def evaluate_symbolic_on_segments_and_sum(filament_fun, segment_list):
 
-    n_filaments = segment_list.shape[1]
-    filament_map = filament_fun.map(n_filaments, 'openmp')
-    all = filament_map(segment_list)
+    # filament_fun is column-wise vectorized: one call covers all segments
+    all = filament_fun(segment_list)
 
     total = cas.sum2(all)
 
@@ -50,21 +50,21 @@ def get_outputs(options, atmos, wind, variables, outputs, parameters, architectu
     b_ref = parameters['theta0', 'geometry', 'b_ref']
     c_ref = parameters['theta0', 'geometry', 'c_ref']
     s_ref = parameters['theta0', 'geometry', 's_ref']
-    reference_lengths = cas.diag(cas.vertcat(b_ref, c_ref, b_ref))
+    reference_lengths = cas.vertcat(b_ref, c_ref, b_ref)
 
     kite_nodes = architecture.kite_nodes
     for kite in kite_nodes:
         parent = architecture.parent_map[kite]
 
         q = xd['q' + str(kite) + str(parent)]
-        kite_dcm = cas.reshape(xd['r' + str(kite) + str(parent)], (3, 3))
+        kite_dcm = tools.get_kite_dcm(xd, kite, parent)
         ehat1 = kite_dcm[:, 0]
         ehat2 = kite_dcm[:, 1]
 
         vec_u_eff = tools.get_u_eff_in_earth_frame(options, variables, wind, kite, architecture)
         u_eff = vect_op.smooth_norm(vec_u_eff)
         rho = atmos.get_density(q[2])
-        q_eff = 0.5 * rho * cas.mtimes(vec_u_eff.T, vec_u_eff)
+        q_eff = 0.5 * rho * cas.dot(vec_u_eff, vec_u_eff)
 
         f_aero_body = tools.get_f_aero_var(variables, kite, parent, parameters)
         coeff_body = f_aero_body / q_eff / s_ref
@@ -72,8 +72,12 @@ def get_outputs(options, atmos, wind, variables, outputs, parameters, architectu
         CY = coeff_body[1]
         CN = coeff_body[2]
 
-        f_aero_wind = frames.from_body_to_wind(vec_u_eff, kite_dcm, f_aero_body)
+        f_aero_earth = frames.from_body_to_earth(kite_dcm, f_aero_body)
+        f_aero = f_aero_earth
+
+        # the wind frame is orthonormal, so its transpose takes earth-fixed vectors into the wind frame
         wind_dcm = frames.get_wind_dcm(vec_u_eff, kite_dcm)
+        f_aero_wind = cas.mtimes(wind_dcm.T, f_aero_earth)
         f_drag = f_aero_wind[0] * wind_dcm[:, 0]
         f_side = f_aero_wind[1] * wind_dcm[:, 1]
         f_lift = f_aero_wind[2] * wind_dcm[:, 2]
@@ -83,11 +87,8 @@ def get_outputs(options, atmos, wind, variables, outputs, parameters, architectu
         CS = coeff_wind[1]
         CL = coeff_wind[2]
 
-        f_aero_earth = frames.from_body_to_earth(kite_dcm, f_aero_body)
-        f_aero = f_aero_earth
-
         m_aero = tools.get_m_aero_var(variables, kite, parent, parameters)
-        CM = cas.mtimes(cas.inv(reference_lengths), m_aero) / q_eff / s_ref
+        CM = m_aero / reference_lengths / q_eff / s_ref
         Cl = CM[0]
         Cm = CM[1]
         Cn = CM[2]
@@ -122,6 +123,9 @@ def get_outputs(options, atmos, wind, variables, outputs, parameters, architectu
 
 def get_force_resi(options, variables, atmos, wind, architecture, parameters):
 
+    # the force and moment function is built once per model build, outside of the kite loop.
+    # it is deliberately not cached across calls: it closes over the symbolic parameters of this model,
+    # which are new symbols every time a model is built.
     aero_coeff_ref_velocity = options['aero']['aero_coeff_ref_velocity']
     if aero_coeff_ref_velocity == 'app':
         force_and_moment_fun = get_force_and_moment_fun_from_u_app_alone_in_kite_frame(options, parameters)
@@ -130,7 +134,10 @@ def get_force_resi(options, variables, atmos, wind, architecture, parameters):
     else:
         awelogger.logger.error('unrecognized velocity field associated with stability derivative computation')
 
-    surface_control = options['surface_control']
+    surface_control = int(options['surface_control'])
+
+    f_scale = tools.get_f_scale(parameters)
+    m_scale = tools.get_m_scale(parameters)
 
     resi = []
     for kite in architecture.kite_nodes:
@@ -139,13 +146,13 @@ def get_force_resi(options, variables, atmos, wind, architecture, parameters):
         f_aero_var = tools.get_f_aero_var(variables, kite, parent, parameters)
         m_aero_var = tools.get_m_aero_var(variables, kite, parent, parameters)
 
-        if int(surface_control) == 0:
+        if surface_control == 0:
             delta = variables['u']['delta' + str(kite) + str(parent)]
-        elif int(surface_control) == 1:
+        elif surface_control == 1:
             delta = variables['xd']['delta' + str(kite) + str(parent)]
 
         omega = variables['xd']['omega' + str(kite) + str(parent)]
-        kite_dcm = cas.reshape(variables['xd']['r' + str(kite) + str(parent)], (3, 3))
+        kite_dcm = tools.get_kite_dcm(variables['xd'], kite, parent)
 
         q = variables['xd']['q' + str(kite) + str(parent)]
         rho = atmos.get_density(q[2])
@@ -162,9 +169,6 @@ def get_force_resi(options, variables, atmos, wind, architecture, parameters):
         # f_found = frames.from_body_to_earth(kite_dcm, f_body_found)
         f_found = f_body_found
 
-        f_scale = tools.get_f_scale(parameters)
-        m_scale = tools.get_m_scale(parameters)
-
         resi_f_kite = (f_aero_var - f_found) / f_scale
         resi_m_kite = (m_aero_var - m_found) / m_scale
 
@@ -203,19 +207,10 @@ def get_force_and_moment_from_u_eff_in_kite_frame(options, parameters, vec_u_eff
 
     CF, CM = stability_derivatives.stability_derivatives(options, alpha_eff, beta_eff, vec_u_eff_sym, dcm_body_frame, omega_sym, delta_sym, parameters)
 
-    u_eff_sq = cas.mtimes(vec_u_eff_sym.T, vec_u_eff_sym)
+    u_eff_sq = cas.dot(vec_u_eff_sym, vec_u_eff_sym)
     dynamic_pressure = 1. / 2. * rho_sym * u_eff_sq
-    planform_area = parameters['theta0', 'geometry', 's_ref']
 
-    force = CF * dynamic_pressure * planform_area
-
-    b_ref = parameters['theta0', 'geometry', 'b_ref']
-    c_ref = parameters['theta0', 'geometry', 'c_ref']
-    reference_lengths = cas.diag(cas.vertcat(b_ref, c_ref, b_ref))
-
-    moment = dynamic_pressure * planform_area * cas.mtimes(reference_lengths, CM)
-
-    force_and_moment = cas.vertcat(force, moment)
+    force_and_moment = get_force_and_moment_from_coefficients(parameters, CF, CM, dynamic_pressure)
 
     return force_and_moment
 
@@ -251,17 +246,25 @@ def get_force_and_moment_from_u_app_alone_in_kite_frame(options, parameters, vec
 
     CF, CM = stability_derivatives.stability_derivatives(options, alpha_app_alone, beta_app_alone, vec_u_app_alone_sym, dcm_body_frame, omega_sym, delta_sym, parameters)
 
-    u_app_sq = cas.mtimes(vec_u_app_alone_sym.T, vec_u_app_alone_sym)
+    u_app_sq = cas.dot(vec_u_app_alone_sym, vec_u_app_alone_sym)
     dynamic_pressure = 1. / 2. * rho_sym * u_app_sq
-    planform_area = parameters['theta0', 'geometry', 's_ref']
 
-    force = CF * dynamic_pressure * planform_area
+    force_and_moment = get_force_and_moment_from_coefficients(parameters, CF, CM, dynamic_pressure)
+
+    return force_and_moment
 
+
+def get_force_and_moment_from_coefficients(parameters, CF, CM, dynamic_pressure):
+
+    planform_area = parameters['theta0', 'geometry', 's_ref']
     b_ref = parameters['theta0', 'geometry', 'b_ref']
     c_ref = parameters['theta0', 'geometry', 'c_ref']
-    reference_lengths = cas.diag(cas.vertcat(b_ref, c_ref, b_ref))
+    reference_lengths = cas.vertcat(b_ref, c_ref, b_ref)
 
-    moment = dynamic_pressure * planform_area * cas.mtimes(reference_lengths, CM)
+    force_scale = dynamic_pressure * planform_area
+
+    force = CF * force_scale
+    moment = force_scale * reference_lengths * CM
 
     force_and_moment = cas.vertcat(force, moment)
 
@@ -276,11 +279,8 @@ def get_wingtip_position(kite, model, variables, parameters, ext_int):
 
     xd = model.variables_dict['xd'](variables['xd'])
 
-    if ext_int == 'ext':
-        span_sign = 1.
-    elif ext_int == 'int':
-        span_sign = -1.
-    else:
+    span_sign = {'ext': 1., 'int': -1.}.get(ext_int)
+    if span_sign is None:
         awelogger.logger.error('wing side not recognized for 6dof kite.')
 
     parent = parent_map[kite]
@@ -290,7 +290,7 @@ def get_wingtip_position(kite, model, variables, parameters, ext_int):
     scale = model.scaling['xd'][name]
     q = q_unscaled * scale
 
-    kite_dcm = cas.reshape(xd['kite_dcm' + str(kite) + str(parent)], (3, 3))
+    kite_dcm = tools.get_kite_dcm(xd, kite, parent)
     ehat_span = kite_dcm[:, 1]
 
     b_ref = parameters['theta0','geometry','b_ref']
@@ -64,6 +64,13 @@ def get_m_scale(parameters):
     return scale
 
 
+##### the kite orientation
+
+def get_kite_dcm(variables_xd, kite, parent):
+    kite_dcm = cas.reshape(variables_xd['r' + str(kite) + str(parent)], (3, 3))
+    return kite_dcm
+
+
 ##### the velocities
 
 def get_u_eff_in_body_frame(options, variables, wind, kite, kite_dcm, architecture):
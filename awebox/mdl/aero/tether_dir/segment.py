@@ -42,11 +42,13 @@ def get_segment_drag_and_moment(n_elements, variables, upper_node, architecture,
         elem_info = element.get_element_info_column(variables, upper_node, architecture, elem, n_elements)
         combined_info = cas.horzcat(combined_info, elem_info)
 
-    drag_map = element_drag_fun.map(n_elements, 'openmp')
+    # the element maps are small and get called inside the (possibly already parallel) model functions,
+    # so a serial map avoids paying an openmp fork/join on every evaluation
+    drag_map = element_drag_fun.map(n_elements, 'serial')
     all_drag = drag_map(combined_info)
     drag = cas.sum2(all_drag)
 
-    moment_map = element_moment_fun.map(n_elements, 'openmp')
+    moment_map = element_moment_fun.map(n_elements, 'serial')
     all_moment = moment_map(combined_info)
     moment = cas.sum2(all_moment)
 
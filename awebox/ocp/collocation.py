@@ -35,6 +35,7 @@ from awebox.logger.logger import Logger as awelogger
 import numpy as np
 import awebox.tools.struct_operations as struct_op
 from collections import OrderedDict
+from functools import lru_cache
 from . import constraints
 
 class Collocation(object):
@@ -138,6 +139,24 @@ class Collocation(object):
         @return interpolation function
         """
 
+        # the interval indices and polynomial bases only depend on the time grid,
+        # so they are evaluated once per grid and shared by all variables
+        @lru_cache(maxsize=4)
+        def get_interval_basis(time_grid):
+
+            kdx_list = []
+            tau_list = []
+            for t in time_grid:
+                kdx, tau = struct_op.calculate_kdx(nlp_params, V, t)
+                kdx_list.append(kdx)
+                tau_list.append(float(tau))
+
+            n_t = len(time_grid)
+            coeffs = self.__coeff_fun.map(n_t)(tau_list).full()
+            coeffs_u = self.__coeff_fun_u.map(n_t)(tau_list).full()
+
+            return np.array(kdx_list, dtype=int), coeffs, coeffs_u
+
         def coll_interpolator(time_grid, name, dim, var_type):
             """Interpolating function
 
@@ -146,18 +165,23 @@ class Collocation(object):
             @param dim xd variable dimension index
             """
 
-            vals = []
-            for t in time_grid:
-                kdx, tau = struct_op.calculate_kdx(nlp_params, V, t)
-                if var_type == 'xd':
-                    poly_vars = cas.vertcat(V['xd',kdx, name, dim], *V['coll_var',kdx, :,'xd', name, dim])
-                    vals = cas.vertcat(vals, cas.mtimes(poly_vars.T, self.__coeff_fun(tau)))
-                elif var_type in ['u', 'xa', 'xl']:
-                    poly_vars = cas.vertcat(*V['coll_var',kdx, :,var_type, name, dim])
-                    vals = cas.vertcat(vals, cas.mtimes(poly_vars.T, self.__coeff_fun_u(tau)))
-                elif var_type in ['int_out']:
-                    poly_vars = cas.vertcat(integral_outputs['int_out',kdx, name, dim], *integral_outputs['coll_int_out',kdx, :, name, dim])
-                    vals = cas.vertcat(vals, cas.mtimes(poly_vars.T, self.__coeff_fun(tau)))
+            n_k = self.__n_k
+            kdx, coeffs, coeffs_u = get_interval_basis(tuple(np.ravel(np.array(time_grid, dtype=float))))
+
+            # polynomial values per interval, one row per interval
+            if var_type == 'xd':
+                interval_vals = np.reshape(np.array(V['xd', :n_k, name, dim], dtype=float), (n_k, 1))
+                coll_vals = np.reshape(np.array(V['coll_var', :, :, 'xd', name, dim], dtype=float), (n_k, -1))
+                poly_vars = np.hstack([interval_vals, coll_vals])
+            elif var_type in ['u', 'xa', 'xl']:
+                poly_vars = np.reshape(np.array(V['coll_var', :, :, var_type, name, dim], dtype=float), (n_k, -1))
+                coeffs = coeffs_u
+            elif var_type in ['int_out']:
+                interval_vals = np.reshape(np.array(integral_outputs['int_out', :n_k, name, dim], dtype=float), (n_k, 1))
+                coll_vals = np.reshape(np.array(integral_outputs['coll_int_out', :, :, name, dim], dtype=float), (n_k, -1))
+                poly_vars = np.hstack([interval_vals, coll_vals])
+
+            vals = cas.DM(np.sum(poly_vars[kdx, :] * coeffs.T, axis=1))
 
             return vals
 
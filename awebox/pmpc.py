@@ -328,23 +328,26 @@ class Pmpc(object):
         n_points_x = self.__t_grid_x_coll.shape[0]
         self.__spline_dict = {}
 
+        # flatten the values once, all merged components are gathered from these
+        V_flat = viz_tools.get_flat_values(V_opt)
+
         for var_type in ['xd','u','xa']:
             self.__spline_dict[var_type] = {}
             for name in list(variables_dict[var_type].keys()):
                 self.__spline_dict[var_type][name] = {}
                 for j in range(variables_dict[var_type][name].shape[0]):
                     if var_type == 'xd':
-                        values, time_grid = viz_tools.merge_xd_values(V_opt, name, j, plot_dict, cosmetics)
-                        self.__spline_dict[var_type][name][j] = ct.interpolant(name+str(j), 'bspline', [[0]+time_grid], [values[-1]]+values, {}).map(n_points_x)
+                        values, time_grid = viz_tools.merge_xd_values(V_opt, name, j, plot_dict, cosmetics, V_flat)
+                        self.__spline_dict[var_type][name][j] = ct.interpolant(name+str(j), 'bspline', [[0]+list(time_grid)], [values[-1]]+list(values), {}).map(n_points_x)
                     elif var_type == 'u':
-                        values, time_grid = viz_tools.merge_xa_values(V_opt, var_type, name, j, plot_dict, cosmetics)
-                        if all(v == 0 for v in values):
+                        values, time_grid = viz_tools.merge_xa_values(V_opt, var_type, name, j, plot_dict, cosmetics, V_flat)
+                        if not np.any(values):
                             self.__spline_dict[var_type][name][j] = ct.Function(name+str(j), [ct.SX.sym('t',n_points)], [np.zeros((1,n_points))])
                         else:
-                            self.__spline_dict[var_type][name][j] = ct.interpolant(name+str(j), 'bspline', [[0]+time_grid], [values[-1]]+values, {}).map(n_points)
+                            self.__spline_dict[var_type][name][j] = ct.interpolant(name+str(j), 'bspline', [[0]+list(time_grid)], [values[-1]]+list(values), {}).map(n_points)
                     elif var_type == 'xa':
-                        values, time_grid = viz_tools.merge_xa_values(V_opt, var_type, name, j, plot_dict, cosmetics)
-                        self.__spline_dict[var_type][name][j] = ct.interpolant(name+str(j), 'bspline', [[0]+time_grid], [values[-1]]+values, {}).map(n_points)
+                        values, time_grid = viz_tools.merge_xa_values(V_opt, var_type, name, j, plot_dict, cosmetics, V_flat)
+                        self.__spline_dict[var_type][name][j] = ct.interpolant(name+str(j), 'bspline', [[0]+list(time_grid)], [values[-1]]+list(values), {}).map(n_points)
 
         def spline_interpolator(t_grid, name, j, var_type):
             """ Interpolate reference on specific time grid for specific variable.
@@ -536,6 +536,19 @@ def scaled_to_si(variables, scaling, n_k, d, V_ori):
 
     return V
 
+def get_si_factors(variables, scaling, n_k, d, V_struct):
+    # scaled_to_si only multiplies entries by constant factors, so those factors follow from converting a struct of ones
+    V_ones = V_struct(cas.DM.ones(V_struct.size, 1))
+    si_factors = scaled_to_si(variables, scaling, n_k, d, V_ones).cat
+
+    return si_factors
+
+def scaled_to_si_with_factors(si_factors, V_ori):
+    # elementwise counterpart of scaled_to_si, for factors from get_si_factors
+    V = V_ori(V_ori.cat * si_factors)
+
+    return V
+
 
 def coll_slice_to_vec(coll_slice):
 
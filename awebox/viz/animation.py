@@ -30,7 +30,6 @@ python-3.5 / casadi 3.0.0
 
 import matplotlib.pyplot as plt
 import matplotlib.animation as manimation
-import casadi.tools as cas
 from . import tools
 import awebox.viz.trajectory as trajectory
 import numpy as np
@@ -147,9 +146,7 @@ def animation_snapshot(axes, plot_dict, index, cosmetics, init_colors=bool(False
             local_color = init_colors
 
         parent = parent_map[n]
-        vertically_stacked_kite_locations = cas.horzcat(plot_dict['xd']['q' + str(n) + str(parent)][0],
-                                                        plot_dict['xd']['q' + str(n) + str(parent)][1],
-                                                        plot_dict['xd']['q' + str(n) + str(parent)][2])
+        vertically_stacked_kite_locations = tools.stack_interpolated_components(plot_dict['xd']['q' + str(n) + str(parent)]).T
 
         for dim in dims:
             ax = 'ax_' + dim
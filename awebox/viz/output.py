@@ -189,7 +189,7 @@ def plot_generic_actuator_output(time_or_cycle, y_var_name, y_var_sym, y_var_lat
                 dash_style = dashes[kdx]
                 line_style = ':'
 
-                line, = axes.plot(x_vals, y_vals, color=color_vals, linestyle=line_style, label=line_label)
+                line, = axes[ldx].plot(x_vals, y_vals, color=color_vals, linestyle=line_style, label=line_label)
                 line.set_dashes(dash_style)
 
         xlabel = x_var_name + ' ' + x_var_latex
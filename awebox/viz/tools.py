@@ -26,220 +26,239 @@ import casadi.tools as cas
 import numpy as np
 import matplotlib.pyplot as plt
 import awebox.tools.struct_operations as struct_op
-from itertools import chain
-import matplotlib.colors as colors
-import matplotlib.cm as cmx
-import awebox.tools.vector_operations as vect_op
+from functools import lru_cache
+from matplotlib.collections import LineCollection
+from mpl_toolkits.mplot3d.art3d import Line3DCollection
 import awebox.opti.diagnostics as diagnostics
 from awebox.logger.logger import Logger as awelogger
 
+# column indices of the two plotted coordinates for each planar side view
+side_indices = {'xy': [0, 1], 'xz': [0, 2], 'yx': [1, 0], 'yz': [1, 2], 'zx': [2, 0], 'zy': [2, 1]}
 
-def get_naca_airfoil_coordinates(s, m, p, t):
 
-    if s < p:
-        yc = m / p**2. * (2. * p * s - s**2.)
+def get_naca_airfoil_coordinates(s, m, p, t):
 
-        dycdx = 2. * m / p**2. * (p - s)
+    # s may be an array of chordwise stations. symmetric profiles have p = 0, so guard the front scale
+    s = np.asarray(s, dtype=float)
+    front = s < p
 
+    if p > 0.:
+        front_scale = m / p**2.
     else:
-        yc = m/ (1. - p)**2. * ((1. - 2. * p) + 2. * p * s - s**2.)
+        front_scale = 0.
+    back_scale = m / (1. - p)**2.
 
-        dycdx = 2. * m / (1. - p) ** 2. * (p - s)
+    yc = np.where(front, front_scale * (2. * p * s - s**2.), back_scale * ((1. - 2. * p) + 2. * p * s - s**2.))
+    dycdx = np.where(front, 2. * front_scale * (p - s), 2. * back_scale * (p - s))
 
     yt = 5. * t * (0.2969 * s**0.5 - 0.1260 * s - 0.3515 * s**2. + 0.2843 * s**3. - 0.1015 * s**5.)
 
-    theta = np.arctan(dycdx)
+    # theta = arctan(dycdx), so sin and cos follow without evaluating the trigonometric functions
+    cos_theta = 1. / np.sqrt(1. + dycdx**2.)
+    sin_theta = dycdx * cos_theta
 
-    xu = s - yt * np.sin(theta)
-    xl = s + yt * np.sin(theta)
+    xu = s - yt * sin_theta
+    xl = s + yt * sin_theta
 
-    yu = yc + yt * np.cos(theta)
-    yl = yc - yt * np.cos(theta)
+    yu = yc + yt * cos_theta
+    yl = yc - yt * cos_theta
 
     return xu, xl, yu, yl
 
-def get_naca_shell(chord, naca="0012", center_at_quarter_chord = True):
+@lru_cache(maxsize=16)
+def get_unit_naca_shell(naca="0012", center_at_quarter_chord = True):
+    # the shell only scales with the chord, so evaluate the profile once per naca code
 
-    m = np.float(naca[0]) / 100.
-    p = np.float(naca[1]) / 10.
-    t = np.float(naca[2:]) / 100.
+    m = float(naca[0]) / 100.
+    p = float(naca[1]) / 10.
+    t = float(naca[2:]) / 100.
 
-    s_list = np.arange(0., 101.) / 100.
+    s = np.linspace(0., 1., 101)
+    n_s = s.shape[0]
 
-    x_upper = []
-    x_lower = []
+    [xu, xl, yu, yl] = get_naca_airfoil_coordinates(s, m, p, t)
 
-    for s in s_list:
-        [xu, xl, yu, yl] = get_naca_airfoil_coordinates(s, m, p, t)
+    # lower surface from trailing to leading edge, then upper surface back to the trailing edge
+    x = np.zeros((2 * n_s, 3))
+    x[:n_s, 0] = xl[::-1]
+    x[:n_s, 2] = yl[::-1]
+    x[n_s:, 0] = xu
+    x[n_s:, 2] = yu
 
-        new_x_upper = xu * vect_op.xhat_np() + yu * vect_op.zhat_np()
-        new_x_lower = xl * vect_op.xhat_np() + yl * vect_op.zhat_np()
+    if center_at_quarter_chord:
+        x[:, 0] -= 0.25
 
-        if center_at_quarter_chord:
-            new_x_upper = new_x_upper - vect_op.xhat_np() / 4.
-            new_x_lower = new_x_lower - vect_op.xhat_np() / 4.
+    # the cached array is shared between callers
+    x.setflags(write=False)
 
-        x_upper = cas.vertcat(x_upper, (chord * new_x_upper.T))
-        x_lower = cas.vertcat(x_lower, (chord * new_x_lower.T))
-
-    x_upper = np.array(x_upper)
-    x_lower = np.array(x_lower)[::-1]
+    return x
 
-    x = np.array(cas.vertcat(x_lower, x_upper))
+@lru_cache(maxsize=16)
+def get_unit_naca_shell_edge_indices(naca="0012", center_at_quarter_chord = True):
+    # the leading and trailing edges are the extreme chordwise points, whatever the chord
+    unit_shell = get_unit_naca_shell(naca, center_at_quarter_chord)
+    return int(np.argmin(unit_shell[:, 0])), int(np.argmax(unit_shell[:, 0]))
 
-    return x
+def get_naca_shell(chord, naca="0012", center_at_quarter_chord = True):
+    return chord * get_unit_naca_shell(naca, center_at_quarter_chord)
 
 def make_side_plot(ax, vertically_stacked_array, side, plot_color, plot_marker=' ', label=None, alpha = 1, linestyle = '-'):
-    vsa = np.array(cas.DM(vertically_stacked_array))
+    # two-dimensional arrays are used as they are, everything else goes through DM
+    if isinstance(vertically_stacked_array, np.ndarray) and vertically_stacked_array.ndim == 2:
+        vsa = vertically_stacked_array
+    else:
+        vsa = np.array(cas.DM(vertically_stacked_array))
 
-    if vsa.shape[0] == 3 and (not vsa.shape[1] == 3):
+    if (not vsa.shape[1] == 3) and vsa.shape[0] == 3:
         vsa = vsa.T
 
     if side == 'isometric':
         ax.plot(vsa[:, 0], vsa[:, 1], zs=vsa[:, 2], color=plot_color, marker=plot_marker, label=label, alpha = alpha, linestyle = linestyle)
     else:
-        side_num = ''
-        for sdx in side:
-            if sdx == 'x':
-                side_num += '0'
-            elif sdx == 'y':
-                side_num += '1'
-            elif sdx == 'z':
-                side_num += '2'
-
-        idx = int(side_num[0])
-        jdx = int(side_num[1])
+        [idx, jdx] = get_side_indices(side)
 
         ax.plot(vsa[:, idx], vsa[:, jdx], color=plot_color, marker=plot_marker, label = label, alpha = alpha, linestyle = linestyle)
 
     return None
 
-def draw_lifting_surface(ax, q, r, b_ref, c_tipn, c_root, c_tipp, kite_color, side, num_per_meter, naca="0012"):
-
-    r_dcm = np.array(cas.reshape(r, (3, 3)))
+def make_side_plot_collection(ax, list_of_paths, side, plot_color, alpha = 1, linestyle = '-'):
+    # draw several (N, 3) paths as a single line collection, rather than as one line per path
 
-    num_spanwise = np.ceil(b_ref * num_per_meter / 2.)
-
-    ypos = np.arange(-1. * num_spanwise, num_spanwise + 1.) / num_spanwise / 2.
+    if side == 'isometric':
+        had_data = ax.has_data()
 
-    leading_edges = []
-    trailing_edges = []
+        collection = Line3DCollection(list_of_paths, colors=plot_color, alpha=alpha, linestyles=linestyle)
+        ax.add_collection3d(collection)
 
-    for y in ypos:
+        all_points = np.concatenate(list_of_paths, axis=0)
+        ax.auto_scale_xyz(all_points[:, 0], all_points[:, 1], all_points[:, 2], had_data)
+    else:
+        [idx, jdx] = get_side_indices(side)
 
-        yloc = cas.mtimes(r_dcm, vect_op.yhat_np()) * y * b_ref
+        segments = [path[:, [idx, jdx]] for path in list_of_paths]
+        collection = LineCollection(segments, colors=plot_color, alpha=alpha, linestyles=linestyle)
+        ax.add_collection(collection)
+        ax.autoscale_view()
 
-        s = np.abs(y)/0.5 # 1 at tips and 0 at root
-        if y < 0:
-            c_local = c_root * (1. - s) + c_tipn * s
-        else:
-            c_local = c_root * (1. - s) + c_tipp * s
+    return None
 
-        basic_shell = get_naca_shell(c_local, naca)
+def get_side_indices(side):
+    return side_indices[side]
 
-        basic_leading_ege = basic_shell[np.argmin(basic_shell[:, 0]), :]
-        basic_trailing_ege = basic_shell[np.argmax(basic_shell[:, 0]), :]
+def draw_lifting_surface(ax, q, r, b_ref, c_tipn, c_root, c_tipp, kite_color, side, num_per_meter, naca="0012", r_dcm=None):
 
-        new_leading_edge = q + yloc + np.array(cas.mtimes(r_dcm, basic_leading_ege.T))
-        new_trailing_edge = q + yloc + np.array(cas.mtimes(r_dcm, basic_trailing_ege.T))
+    if r_dcm is None:
+        r_dcm = np.array(cas.reshape(r, (3, 3)))
+    q_np = np.reshape(np.array(cas.DM(q)), (3,))
+    yhat_earth = r_dcm[:, 1]
 
-        leading_edges = cas.vertcat(leading_edges, new_leading_edge.T)
-        trailing_edges = cas.vertcat(trailing_edges, new_trailing_edge.T)
+    num_spanwise = np.ceil(b_ref * num_per_meter / 2.)
 
-        horizontal_shell = []
-        for idx in range(basic_shell[:, 0].shape[0]):
+    ypos = np.arange(-1. * num_spanwise, num_spanwise + 1.) / num_spanwise / 2.
 
-            new_point = q + yloc + np.array(cas.mtimes(r_dcm, basic_shell[idx, :].T))
+    s = np.abs(ypos)/0.5 # 1 at tips and 0 at root
+    c_tip = np.where(ypos < 0, c_tipn, c_tipp)
+    c_local = c_root * (1. - s) + c_tip * s
 
-            horizontal_shell = cas.vertcat(horizontal_shell, new_point.T)
-        horizontal_shell = np.array(horizontal_shell)
+    unit_shell = get_unit_naca_shell(naca)
+    horizontal_shells = get_transformed_shells(unit_shell, c_local, r_dcm, q_np, yhat_earth, ypos * b_ref)
 
-        make_side_plot(ax, horizontal_shell, side, kite_color)
+    [leading_idx, trailing_idx] = get_unit_naca_shell_edge_indices(naca)
+    leading_edges = horizontal_shells[:, leading_idx, :]
+    trailing_edges = horizontal_shells[:, trailing_idx, :]
 
-    make_side_plot(ax, leading_edges, side, kite_color)
-    make_side_plot(ax, trailing_edges, side, kite_color)
+    make_side_plot_collection(ax, list(horizontal_shells), side, kite_color)
+    make_side_plot_collection(ax, [leading_edges, trailing_edges], side, kite_color)
 
     return None
 
-def draw_kite_fuselage(ax, q, r, length, kite_color, side, num_per_meter, naca="0006"):
+def draw_kite_fuselage(ax, q, r, length, kite_color, side, num_per_meter, naca="0006", r_dcm=None):
 
-    r_dcm = np.array(cas.reshape(r, (3, 3)))
+    if r_dcm is None:
+        r_dcm = np.array(cas.reshape(r, (3, 3)))
+    q_np = np.reshape(np.array(cas.DM(q)), (3,))
+    yhat_earth = r_dcm[:, 1]
 
-    total_width = np.float(naca[2:]) / 100. * length
+    total_width = float(naca[2:]) / 100. * length
 
     num_spanwise = np.ceil(total_width * num_per_meter / 2.)
 
     ypos = np.arange(-1. * num_spanwise, num_spanwise + 1.) / num_spanwise / 2.
 
-    for y in ypos:
+    scales = length * (1 - (2. * ypos)**2.)
 
-        yloc = cas.mtimes(r_dcm, vect_op.yhat_np()) * y * total_width
+    horizontal_shells = get_transformed_shells(get_unit_naca_shell(naca), scales, r_dcm, q_np, yhat_earth, ypos * total_width)
 
-        basic_shell = get_naca_shell(length, naca) * (1 - (2. * y)**2.)
+    make_side_plot_collection(ax, list(horizontal_shells), side, kite_color)
 
-        horizontal_shell = []
-        for idx in range(basic_shell[:, 0].shape[0]):
+    return None
 
-            new_point = q + yloc + np.array(cas.mtimes(r_dcm, basic_shell[idx, :].T))
+def get_transformed_shells(unit_shell, scales, r_dcm, q, yhat_earth, span_offsets):
+    # the rotation is linear, so rotate the unit shell once and scale the rotated points per station.
+    # returns an array of shape (number of stations, points per shell, 3)
 
-            horizontal_shell = cas.vertcat(horizontal_shell, new_point.T)
-        horizontal_shell = np.array(horizontal_shell)
+    rotated_unit_shell = np.matmul(unit_shell, r_dcm.T)
 
-        make_side_plot(ax, horizontal_shell, side, kite_color)
+    offsets = q[None, :] + span_offsets[:, None] * yhat_earth[None, :]
 
-    return None
+    return scales[:, None, None] * rotated_unit_shell[None, :, :] + offsets[:, None, :]
 
-def draw_kite_wing(ax, q, r, b_ref, c_root, c_tip, kite_color, side, num_per_meter, naca="0012"):
+def draw_kite_wing(ax, q, r, b_ref, c_root, c_tip, kite_color, side, num_per_meter, naca="0012", r_dcm=None):
 
-    draw_lifting_surface(ax, q, r, b_ref, c_tip, c_root, c_tip, kite_color, side, num_per_meter, naca)
+    draw_lifting_surface(ax, q, r, b_ref, c_tip, c_root, c_tip, kite_color, side, num_per_meter, naca, r_dcm=r_dcm)
 
-def draw_kite_horizontal(ax, q, r, length, height, b_ref, c_ref, kite_color, side, num_per_meter, naca="0012"):
+def draw_kite_horizontal(ax, q, r, length, height, b_ref, c_ref, kite_color, side, num_per_meter, naca="0012", r_dcm=None):
 
-    r_dcm = np.array(cas.reshape(r, (3, 3)))
+    if r_dcm is None:
+        r_dcm = np.array(cas.reshape(r, (3, 3)))
     ehat_1 = np.reshape(r_dcm[:, 0], (3,1))
     ehat_3 = np.reshape(r_dcm[:, 2], (3,1))
 
     horizontal_space = (3. * length / 4. - c_ref / 3.) * ehat_1
     pos = q + horizontal_space + ehat_3 * height
 
-    draw_lifting_surface(ax, pos, r_dcm, b_ref / 3., c_ref / 3., c_ref / 2., c_ref / 3., kite_color, side, num_per_meter, naca)
+    draw_lifting_surface(ax, pos, r_dcm, b_ref / 3., c_ref / 3., c_ref / 2., c_ref / 3., kite_color, side, num_per_meter, naca, r_dcm=r_dcm)
 
-def draw_kite_vertical(ax, q, r, length, height, b_ref, c_ref, kite_color, side, num_per_meter, naca="0012"):
+def draw_kite_vertical(ax, q, r, length, height, b_ref, c_ref, kite_color, side, num_per_meter, naca="0012", r_dcm=None):
 
-    r_dcm = np.array(cas.reshape(r, (3, 3)))
-    r_dcm = np.array(cas.reshape(r, (3, 3)))
+    if r_dcm is None:
+        r_dcm = np.array(cas.reshape(r, (3, 3)))
     ehat_1 = np.reshape(r_dcm[:, 0], (3, 1))
     ehat_3 = np.reshape(r_dcm[:, 2], (3, 1))
 
     new_ehat1 = ehat_1
     new_ehat2 = ehat_3
-    new_ehat3 = np.array(vect_op.normed_cross(new_ehat1, new_ehat2))
-    r_new = np.array(cas.horzcat(new_ehat1, new_ehat2, new_ehat3))
+    new_ehat3 = np.reshape(np.cross(new_ehat1[:, 0], new_ehat2[:, 0]), (3, 1))
+    new_ehat3 = new_ehat3 / np.linalg.norm(new_ehat3)
+    r_new = np.hstack([new_ehat1, new_ehat2, new_ehat3])
 
     horizontal_space = (3. * length / 4. - c_ref / 3.) * ehat_1
     pos = q + horizontal_space + ehat_3 * height / 2.
 
-    draw_lifting_surface(ax, pos, r_new, height, c_ref, c_ref / 2., c_ref / 4., kite_color, side, num_per_meter, naca)
+    draw_lifting_surface(ax, pos, r_new, height, c_ref, c_ref / 2., c_ref / 4., kite_color, side, num_per_meter, naca, r_dcm=r_new)
 
 def draw_kite(ax, q, r, model_options, kite_color, side, num_per_meter):
     # read in inputs
     geometry = model_options['geometry']
     geometry_params = model_options['params']['geometry']
 
+    # the orientation is shared by all kite components, so only reshape it once
+    r_dcm = np.array(cas.reshape(r, (3, 3)))
+
     if geometry['fuselage']:
-        draw_kite_fuselage(ax, q, r, geometry['length'], kite_color, side, num_per_meter)
+        draw_kite_fuselage(ax, q, r, geometry['length'], kite_color, side, num_per_meter, r_dcm=r_dcm)
 
     if geometry['wing']:
 
         if not geometry['wing_profile'] == None:
             draw_kite_wing(ax, q, r, geometry_params['b_ref'], geometry['c_root'], geometry['c_tip'], kite_color, side,
-                           num_per_meter, geometry['wing_profile'])
+                           num_per_meter, geometry['wing_profile'], r_dcm=r_dcm)
         else:
-            draw_kite_wing(ax, q, r, geometry_params['b_ref'], geometry['c_root'], geometry['c_tip'], kite_color, side, num_per_meter)
+            draw_kite_wing(ax, q, r, geometry_params['b_ref'], geometry['c_root'], geometry['c_tip'], kite_color, side, num_per_meter, r_dcm=r_dcm)
 
     if geometry['tail']:
-        draw_kite_horizontal(ax, q, r, geometry['length'], geometry['height'], geometry_params['b_ref'], geometry_params['c_ref'], kite_color, side, num_per_meter)
-        draw_kite_vertical(ax, q, r, geometry['length'], geometry['height'], geometry_params['b_ref'], geometry_params['c_ref'], kite_color, side, num_per_meter)
+        draw_kite_horizontal(ax, q, r, geometry['length'], geometry['height'], geometry_params['b_ref'], geometry_params['c_ref'], kite_color, side, num_per_meter, r_dcm=r_dcm)
+        draw_kite_vertical(ax, q, r, geometry['length'], geometry['height'], geometry_params['b_ref'], geometry_params['c_ref'], kite_color, side, num_per_meter, r_dcm=r_dcm)
 
 
 
@@ -267,7 +286,7 @@ def plot_output_block(plot_table_r, plot_table_c, params, output, plt, fig, idx,
     else:
         plt.title(output_name)
 
-def merge_output_values(output_vals, output_type, output_name, dim, plot_dict, cosmetics):
+def merge_output_values(output_vals, output_type, output_name, dim, plot_dict, cosmetics, flat_values=None):
 
     # read in inputs
     discretization = plot_dict['discretization']
@@ -282,23 +301,28 @@ def merge_output_values(output_vals, output_type, output_name, dim, plot_dict, c
     # interval time points
     tgrid_u = plot_dict['time_grids']['u']
 
+    # the values are gathered from the flat vector in one go
+    if flat_values is None:
+        flat_values = get_flat_values(output_vals)
+
     if discretization == 'multiple_shooting':
         # take interval values
-        output_values = np.array(cas.vertcat(*output_vals['outputs',:,output_type,output_name,dim]).full())
+        output_values = flat_values[output_vals.f['outputs',:,output_type,output_name,dim]]
         tgrid = tgrid_u
 
         ndim = output_vals['outputs',0,output_type,output_name].shape[0]
 
     elif discretization == 'direct_collocation':
         if scheme != 'radau':
-            output_values = []
+            indices = []
             # merge interval and node values
             for k in range(plot_dict['n_k']):
                 # add interval values
-                output_values = cas.vertcat(output_values, output_vals['outputs',k, output_type, output_name,dim])
+                indices += output_vals.f['outputs',k, output_type, output_name,dim]
                 if cosmetics['plot_coll']:
                     # add node values
-                    output_values = cas.vertcat(output_values, cas.vertcat(*output_vals['coll_outputs',k, :, output_type, output_name,dim]))
+                    indices += output_vals.f['coll_outputs',k, :, output_type, output_name,dim]
+            output_values = flat_values[indices]
 
             if cosmetics['plot_coll']:
                 tgrid = tgrid_u_coll
@@ -309,7 +333,7 @@ def merge_output_values(output_vals, output_type, output_name, dim, plot_dict, c
         else:
             if cosmetics['plot_coll']:
                 # add only node values for radau case
-                output_values = np.array(struct_op.coll_slice_to_vec(output_vals['coll_outputs',:,:,output_type,output_name,dim]))
+                output_values = flat_values[output_vals.f['coll_outputs',:,:,output_type,output_name,dim]]
                 tgrid = tgrid_coll
                 ndim = output_vals['coll_outputs',0,0,output_type,output_name].shape[0]
             else:
@@ -318,15 +342,88 @@ def merge_output_values(output_vals, output_type, output_name, dim, plot_dict, c
                 ndim = 1
 
 
-    # make list of time grid and values
-    tgrid = list(chain.from_iterable(tgrid.full().tolist()))
-    output_values = list(chain.from_iterable(output_values))
+    # make flat arrays of time grid and values
+    tgrid = np.asarray(tgrid, dtype=float).ravel()
+    output_values = np.asarray(output_values, dtype=float).ravel()
 
     return output_values, tgrid, ndim
 
-def merge_xd_values(V ,name, dim, plot_dict, cosmetics):
+def merge_xd_values(V ,name, dim, plot_dict, cosmetics, flat_values=None):
 
     # read in inputs
+    xd_indices = get_xd_merge_indices(V, name, plot_dict, cosmetics)
+    tgrid = get_xd_merge_time_grid(plot_dict, cosmetics)
+
+    # gather the merged values from the flat vector
+    if flat_values is None:
+        flat_values = get_flat_values(V)
+    xd_values = flat_values[xd_indices[dim]]
+
+    return xd_values, tgrid
+
+def merge_xd_values_all(V, name, plot_dict, cosmetics, flat_values=None):
+    # same as merge_xd_values, but for all components of the variable at once.
+    # returns the values as an (n_dim, n_time) array
+
+    xd_indices = get_xd_merge_indices(V, name, plot_dict, cosmetics)
+    tgrid = get_xd_merge_time_grid(plot_dict, cosmetics)
+
+    # gather the merged values from the flat vector
+    if flat_values is None:
+        flat_values = get_flat_values(V)
+    xd_values = flat_values[xd_indices]
+
+    return xd_values, tgrid
+
+def get_flat_values(V):
+    # flat array of all struct values, to be computed once and shared by all merged components of V
+    return np.ravel(V.cat.full())
+
+def get_xd_merge_indices(V, name, plot_dict, cosmetics):
+
+    # the positions of the merged values in the flat vector only depend on the structure of V,
+    # so they are looked up once per plot dict
+    merge_indices = plot_dict.setdefault('xd_merge_indices', {})
+    key = (name, cosmetics['plot_coll'])
+
+    if not key in merge_indices.keys():
+
+        discretization = plot_dict['discretization']
+        if discretization == 'direct_collocation':
+            scheme = plot_dict['options']['nlp']['collocation']['scheme']
+
+        n_dim = len(V.f['xd', 0, name])
+        xd_indices = []
+        for dim in range(n_dim):
+            if discretization == 'multiple_shooting':
+                # take interval values
+                dim_indices = V.f['xd', :, name, dim]
+
+            elif discretization == 'direct_collocation':
+                if scheme != 'radau':
+                    dim_indices = []
+                    # merge interval and node values
+                    for k in range(plot_dict['n_k']+1):
+                        # add interval values
+                        dim_indices += V.f['xd', k, name, dim]
+                        if (cosmetics['plot_coll'] and k < plot_dict['n_k']):
+                            # add node values
+                            dim_indices += V.f['coll_var', k, :, 'xd', name, dim]
+
+                elif scheme == 'radau':
+                    if cosmetics['plot_coll']:
+                        # add node values
+                        dim_indices = V.f['coll_var', :, :, 'xd', name, dim]
+                    else:
+                        dim_indices = []
+
+            xd_indices.append(dim_indices)
+
+        merge_indices[key] = np.reshape(np.array(xd_indices, dtype=int), (n_dim, -1))
+
+    return merge_indices[key]
+
+def get_xd_merge_time_grid(plot_dict, cosmetics):
 
     discretization = plot_dict['discretization']
     if discretization == 'direct_collocation':
@@ -336,25 +433,14 @@ def merge_xd_values(V ,name, dim, plot_dict, cosmetics):
         # total time points
         tgrid_x_coll = plot_dict['time_grids']['x_coll']
 
-        # interval time points
+    # interval time points
     tgrid_x = plot_dict['time_grids']['x']
 
     if discretization == 'multiple_shooting':
-        # take interval values
-        xd_values = np.array(cas.vertcat(*V['xd',:,name,dim]).full())
         tgrid = tgrid_x
 
     elif discretization == 'direct_collocation':
         if scheme != 'radau':
-            xd_values = []
-            # merge interval and node values
-            for k in range(plot_dict['n_k']+1):
-                # add interval values
-                xd_values = cas.vertcat(xd_values, V['xd',k, name,dim])
-                if (cosmetics['plot_coll'] and k < plot_dict['n_k']):
-                    # add node values
-                    xd_values = cas.vertcat(xd_values, cas.vertcat(*V['coll_var',k, :, 'xd', name,dim]).full())
-
             if cosmetics['plot_coll']:
                 tgrid = tgrid_x_coll
             else:
@@ -362,20 +448,16 @@ def merge_xd_values(V ,name, dim, plot_dict, cosmetics):
 
         elif scheme == 'radau':
             if cosmetics['plot_coll']:
-                # add node values
-                xd_values = np.array(struct_op.coll_slice_to_vec(V['coll_var',:, :, 'xd', name,dim]))
                 tgrid = tgrid_coll
             else:
-                xd_values = []
                 tgrid = []
 
-    # make list of time grid and values
-    tgrid = list(chain.from_iterable(tgrid.full().tolist()))
-    xd_values = list(chain.from_iterable(xd_values))
+    # make flat array of time grid
+    tgrid = np.asarray(tgrid, dtype=float).ravel()
 
-    return xd_values, tgrid
+    return tgrid
 
-def merge_xa_values(V, var_type, name, dim, plot_dict, cosmetics):
+def merge_xa_values(V, var_type, name, dim, plot_dict, cosmetics, flat_values=None):
 
     # read in inputs
     discretization = plot_dict['discretization']
@@ -388,21 +470,26 @@ def merge_xa_values(V, var_type, name, dim, plot_dict, cosmetics):
     # interval time points
     tgrid_xa = plot_dict['time_grids']['u']
 
+    # the values are gathered from the flat vector in one go
+    if flat_values is None:
+        flat_values = get_flat_values(V)
+
     if discretization == 'multiple_shooting':
         # take interval values
-        xa_values = np.array(cas.vertcat(*V[var_type,:,name,dim]).full())
+        xa_values = flat_values[V.f[var_type,:,name,dim]]
         tgrid = tgrid_xa
 
     elif discretization == 'direct_collocation':
         if scheme != 'radau':
-            xa_values = []
+            indices = []
             # merge interval and node values
             for k in range(plot_dict['n_k']):
                 # add interval values
-                xa_values = cas.vertcat(xa_values, V[var_type,k, name,dim])
+                indices += V.f[var_type,k, name,dim]
                 if cosmetics['plot_coll']:
                     # add node values
-                    xa_values = cas.vertcat(xa_values, cas.vertcat(*V['coll_var',k, :, var_type, name,dim]))
+                    indices += V.f['coll_var',k, :, var_type, name,dim]
+            xa_values = flat_values[indices]
 
             if cosmetics['plot_coll']:
                 tgrid = tgrid_xa_coll
@@ -412,15 +499,15 @@ def merge_xa_values(V, var_type, name, dim, plot_dict, cosmetics):
         elif scheme == 'radau':
             if cosmetics['plot_coll']:
                 # add node values
-                xa_values = np.array(struct_op.coll_slice_to_vec(V['coll_var',:, :, var_type, name,dim]))
+                xa_values = flat_values[V.f['coll_var',:, :, var_type, name,dim]]
                 tgrid = tgrid_coll
             else:
                 xa_values = []
                 tgrid = []
 
-    # make list of time grid and values
-    tgrid = list(chain.from_iterable(tgrid.full().tolist()))
-    xa_values = list(chain.from_iterable(xa_values))
+    # make flat arrays of time grid and values
+    tgrid = np.asarray(tgrid, dtype=float).ravel()
+    xa_values = np.asarray(xa_values, dtype=float).ravel()
 
     return xa_values, tgrid
 
@@ -441,22 +528,24 @@ def merge_integral_output_values(int_out, name, plot_dict, cosmetics):
         tgrid = tgrid_x
 
     elif discretization == 'direct_collocation':
-        output_values = []
+        pieces = []
         # merge interval and node values
         for k in range(plot_dict['n_k']+1):
             # add interval values
-            output_values = cas.vertcat(output_values, int_out['int_out',k, name])
+            pieces.append(int_out['int_out',k, name])
             if (cosmetics['plot_coll'] and k < plot_dict['n_k']):
                 # add node values
-                output_values = cas.vertcat(output_values, cas.vertcat(*int_out['coll_int_out',k, :, name]))
+                pieces.extend(int_out['coll_int_out',k, :, name])
+        output_values = cas.vertcat(*pieces)
 
         if cosmetics['plot_coll']:
             tgrid = tgrid_x_coll
         else:
             tgrid = tgrid_x
 
-    # make list of time grid and values
-    tgrid = list(chain.from_iterable(tgrid.full().tolist()))
+    # make flat arrays of time grid and values
+    tgrid = np.asarray(tgrid, dtype=float).ravel()
+    output_values = np.asarray(output_values, dtype=float).ravel()
 
     return output_values, tgrid
 
@@ -471,56 +560,26 @@ def plot_trajectory_contents(ax, plot_dict, cosmetics, side, init_colors=bool(Fa
 
     num_per_meter = cosmetics['trajectory']['kite_num_per_meter']
 
-    # get kite locations
+    # get kite locations, as arrays with one row per component
     kite_locations = []
     kite_ref_locations = []
     kite_rotations = []
-    skipping_kite_locations = []
-    skipping_kite_rotations = []
 
     for n in kite_nodes:
 
-        traj = []
-        traj_ref = []
-        rot = []
-
         parent = parent_map[n]
 
-        for j in range(3):
-            traj.append(
-                cas.vertcat(plot_dict['xd']['q' + str(n) + str(parent)][j])#,
-                # plot_dict['xd']['q' + str(n) + str(parent)][j][0])
-            )
-            if cosmetics['plot_ref']:
-                traj_ref.append(cas.vertcat(plot_dict['ref']['xd']['q' + str(n) + str(parent)][j]))
-            # traj.append(merge_xd_values(V_plot,'q' + str(n) + str(parent),j, plot_dict, cosmetics)[0])
+        kite_locations.append(stack_interpolated_components(plot_dict['xd']['q' + str(n) + str(parent)]))
+        if cosmetics['plot_ref']:
+            kite_ref_locations.append(stack_interpolated_components(plot_dict['ref']['xd']['q' + str(n) + str(parent)]))
 
         if int(kite_dof) == 6:
-            for j in range(9):
-                rot.append(plot_dict['xd']['r' + str(n) + str(parent)][j])
-                # rot.append(merge_xd_values(V_plot,'r' + str(n) + str(parent),j, plot_dict, cosmetics)[0])
+            kite_rotations.append(stack_interpolated_components(plot_dict['xd']['r' + str(n) + str(parent)]))
         elif int(kite_dof) == 3:
-            for j in range(9):
-                rot.append(plot_dict['outputs']['aerodynamics']['r' + str(n)][j])
-                # rot.append(merge_output_values(outputs,'aerodynamics', 'r'+ str(n),j, plot_dict, cosmetics)[0])
-
-        kite_locations.append(traj)
-        kite_ref_locations.append(traj_ref)
-        kite_rotations.append(rot)
+            kite_rotations.append(stack_interpolated_components(plot_dict['outputs']['aerodynamics']['r' + str(n)]))
 
     skip_value = nlp_options['collocation']['d'] + 1
 
-    for i in range(len(kite_nodes)):
-        if (cosmetics['trajectory']['kite_bodies'] and plot_kites):
-
-            for jdx in range(3):
-                skipping_kite_locations = np.array(
-                    cas.horzcat(skipping_kite_locations, kite_locations[i][jdx][::skip_value]))
-
-            for jdx in range(9):
-                skipping_kite_rotations = np.array(
-                    cas.horzcat(skipping_kite_rotations, kite_rotations[i][jdx][::skip_value]))
-
     old_label = None
     for i in range(len(kite_nodes)):
         if init_colors == True:
@@ -530,33 +589,33 @@ def plot_trajectory_contents(ax, plot_dict, cosmetics, side, init_colors=bool(Fa
         else:
             local_color = init_colors
 
-        vertically_stacked_kite_locations = cas.horzcat(kite_locations[i][0],
-                                                    kite_locations[i][1],
-                                                    kite_locations[i][2])
-
         if old_label == label:
             label = None
-        make_side_plot(ax, vertically_stacked_kite_locations, side, local_color, label=label)
+        make_side_plot(ax, kite_locations[i].T, side, local_color, label=label)
 
         if cosmetics['plot_ref']:
-            vertically_stacked_kite_ref_locations = cas.horzcat(kite_ref_locations[i][0],
-                                                        kite_ref_locations[i][1],
-                                                        kite_ref_locations[i][2])
-            make_side_plot(ax, vertically_stacked_kite_ref_locations, side, local_color, label=label,linestyle='--')
+            make_side_plot(ax, kite_ref_locations[i].T, side, local_color, label=label,linestyle='--')
 
         old_label = label
 
         if (cosmetics['trajectory']['kite_bodies'] and plot_kites):
-            # for pdx in [0]:
-            for pdx in range(skipping_kite_locations.shape[0]):
-                q_all_kites = np.reshape(skipping_kite_locations[pdx, :], (3 * len(kite_nodes), 1))
-                r_all_kites = np.reshape(skipping_kite_rotations[pdx, :], (9 * len(kite_nodes), 1))
+            skipping_kite_locations = kite_locations[i][:, ::skip_value]
+            skipping_kite_rotations = kite_rotations[i][:, ::skip_value]
 
-                q = q_all_kites[i * 3 : (i + 1) * 3]
-                r = r_all_kites[i * 9 : (i + 1) * 9]
+            for pdx in range(skipping_kite_locations.shape[1]):
+                q = np.reshape(skipping_kite_locations[:, pdx], (3, 1))
+                r = np.reshape(skipping_kite_rotations[:, pdx], (9, 1))
 
                 draw_kite(ax, q, r, model_options, local_color, side, num_per_meter)
 
+def stack_interpolated_components(components):
+    # interpolated values are stored per component, either as arrays or as DM columns
+    return np.array([np.ravel(np.array(component, dtype=float)) for component in components])
+
+def get_instant_components(components, index):
+    # values of all components at one interpolation index, as a column
+    return np.reshape(np.array([float(component[index]) for component in components]), (len(components), 1))
+
 def get_q_limits(plot_dict, cosmetics):
     dims = ['x', 'y', 'z']
 
@@ -579,9 +638,6 @@ def get_q_limits(plot_dict, cosmetics):
 
 def get_q_extrema_in_dimension(dim, plot_dict, cosmetics):
 
-    temp_min = 1.e5
-    temp_max = -1.e5
-
     if dim == 'x' or dim == '0':
         jdx = 0
         dim = 'x'
@@ -598,15 +654,22 @@ def get_q_extrema_in_dimension(dim, plot_dict, cosmetics):
         message = 'selected dimension for q_limits not supported. setting dimension to x'
         awelogger.logger.warning(message)
 
+    # gather all relevant values, then reduce once
+    all_vals = []
     for name in list(plot_dict['xd'].keys()):
         if name[0] == 'q':
-            temp_min = np.min(cas.vertcat(temp_min, np.min(plot_dict['xd'][name][jdx])))
-            temp_max = np.max(cas.vertcat(temp_max, np.max(plot_dict['xd'][name][jdx])))
+            all_vals.append(np.ravel(np.array(plot_dict['xd'][name][jdx], dtype=float)))
 
         if name[0] == 'w' and name[1] == dim and cosmetics['trajectory']['wake_nodes']:
-            vals = np.array(cas.vertcat(*plot_dict['xd'][name]))
-            temp_min = np.min(cas.vertcat(temp_min, np.min(vals)))
-            temp_max = np.max(cas.vertcat(temp_max, np.max(vals)))
+            all_vals.append(stack_interpolated_components(plot_dict['xd'][name]).ravel())
+
+    if all_vals:
+        all_vals = np.concatenate(all_vals)
+    else:
+        all_vals = np.zeros(1)
+
+    temp_min = np.min(all_vals)
+    temp_max = np.max(all_vals)
 
     # get margins
     margin = cosmetics['trajectory']['margin']
@@ -646,30 +709,30 @@ def plot_control_block(cosmetics, V_opt, plt, fig, plot_table_r, plot_table_c, i
     tgrid_ip = plot_dict['time_grids']['ip']
 
     plt.subplot(plot_table_r, plot_table_c, idx)
-    for jdx in range(number_dim):
-        if plot_dict['u_param'] == 'poly':
-            p = plt.plot(tgrid_ip, plot_dict['u'][name][jdx])
-            if plot_dict['options']['visualization']['cosmetics']['plot_ref']:
-                plt.plot(plot_dict['time_grids']['ref']['ip'], plot_dict['ref']['u'][name][jdx],
-                    linestyle= '--', color = p[-1].get_color() )
 
-        else:
-            p = plt.step(tgrid_ip, plot_dict['u'][name][jdx],where='post')
-            if plot_dict['options']['visualization']['cosmetics']['plot_ref']:
-                plt.step(plot_dict['time_grids']['ref']['ip'], plot_dict['ref']['u'][name][jdx],where='post',
-                    linestyle =  '--', color = p[-1].get_color())
+    # draw all dimensions of the control with one call, as columns of a (n_time, number_dim) array
+    values = stack_interpolated_components(plot_dict['u'][name][:number_dim]).T
+    if plot_dict['u_param'] == 'poly':
+        p = plt.plot(tgrid_ip, values)
+    else:
+        p = plt.step(tgrid_ip, values, where='post')
+
+    if plot_dict['options']['visualization']['cosmetics']['plot_ref']:
+        tgrid_ref = plot_dict['time_grids']['ref']['ip']
+        ref_values = stack_interpolated_components(plot_dict['ref']['u'][name][:number_dim]).T
+        for jdx in range(number_dim):
+            if plot_dict['u_param'] == 'poly':
+                plt.plot(tgrid_ref, ref_values[:, jdx], linestyle= '--', color = p[jdx].get_color())
+            else:
+                plt.step(tgrid_ref, ref_values[:, jdx], where='post', linestyle = '--', color = p[jdx].get_color())
     plt.grid(True)
     plt.title(name)
 
 def get_sweep_colors(number_of_trials):
 
+    # one rgba row per trial, evenly spaced over the colormap
     cmap = plt.get_cmap('jet')
-    c_norm = colors.Normalize(vmin=0, vmax=(number_of_trials - 1))
-    scalar_map = cmx.ScalarMappable(norm=c_norm, cmap=cmap)
-
-    color_list = []
-    for trial in range(number_of_trials):
-        color_list += [scalar_map.to_rgba(np.float(trial))]
+    color_list = cmap(np.linspace(0., 1., number_of_trials))
 
     return color_list
 
@@ -677,19 +740,76 @@ def spline_interpolation(time_grid, values, time_grid_ip, n_points, name):
     """ Interpolate solution values with b-splines
     """
 
-    # create interpolating function
-    if all(v == 0 for v in values):
-        # can't use splines if all entries zero
-        values_ip = np.zeros(len(time_grid_ip))
-    else:
-        spline = cas.interpolant(name, 'bspline', [time_grid], values, {})
-        # function map to new discretization
-        spline = spline.map(n_points)
-        # interpolate
-        values_ip = spline(time_grid_ip).full()[0]
+    values = np.reshape(np.array(values, dtype=float), (1, -1))
+    values_ip = spline_interpolation_components(time_grid, values, time_grid_ip, n_points, name)[0]
 
     return values_ip
 
+def spline_interpolation_components(time_grid, values, time_grid_ip, n_points, name):
+    """ Interpolate the rows of a (n_components, n_time) array of solution values with b-splines
+    """
+
+    values = np.array(values, dtype=float)
+    time_grid = np.ravel(np.array(time_grid, dtype=float))
+    time_grid_ip = np.ravel(np.array(time_grid_ip, dtype=float))
+
+    # the b-spline passes through its data, so interpolating on the same grid returns the values
+    if time_grid_ip.shape == time_grid.shape and np.array_equal(time_grid_ip, time_grid):
+        return values.copy()
+
+    # the b-spline fit is linear in the values, so the interpolation reduces to one matrix product
+    interpolation_matrix = get_spline_interpolation_matrix(time_grid.tobytes(), time_grid_ip.tobytes())
+    values_ip = np.dot(values, interpolation_matrix)
+
+    return values_ip
+
+@lru_cache(maxsize=8)
+def get_spline_interpolation_matrix(time_grid_bytes, time_grid_ip_bytes):
+    """ Interpolation matrix of the b-spline through a time grid, evaluated on the interpolating time grid.
+    Row i holds the spline through the i-th unit vector, and the matrix is cached per pair of time grids.
+    """
+
+    time_grid = np.frombuffer(time_grid_bytes, dtype=float)
+    time_grid_ip = np.frombuffer(time_grid_ip_bytes, dtype=float)
+    n_time = time_grid.shape[0]
+    n_points = time_grid_ip.shape[0]
+
+    # fit one b-spline output per unit vector
+    spline = cas.interpolant('spline_basis', 'bspline', [time_grid], np.ravel(np.eye(n_time), order='F'), {})
+    # function map to new discretization
+    spline = spline.map(n_points)
+    interpolation_matrix = np.reshape(spline(time_grid_ip).full(), (n_time, n_points))
+    interpolation_matrix.setflags(write=False)
+
+    return interpolation_matrix
+
+def interpolate_merged_values(merged_dict, time_grid_ip, n_points, label):
+    """ Interpolate the merged values of several variables, with one multi-output spline per distinct time grid
+    :param merged_dict: the merge_*_values results of every component, by variable name
+    :return: dictionary with the list of interpolated components, by variable name
+    """
+
+    # group the variables by the time grid they were merged on
+    grouped_names = {}
+    for name in merged_dict.keys():
+        if merged_dict[name]:
+            grid_key = np.asarray(merged_dict[name][0][1], dtype=float).tobytes()
+            grouped_names.setdefault(grid_key, []).append(name)
+
+    interpolated = {name: [] for name in merged_dict.keys()}
+    for names in grouped_names.values():
+        time_grid = merged_dict[names[0]][0][1]
+        values = np.array([merged_component[0] for name in names for merged_component in merged_dict[name]])
+        values_ip = spline_interpolation_components(time_grid, values, time_grid_ip, n_points, label)
+
+        row = 0
+        for name in names:
+            n_dim = len(merged_dict[name])
+            interpolated[name] = list(values_ip[row:row + n_dim])
+            row += n_dim
+
+    return interpolated
+
 def calibrate_visualization(model, nlp, name, options):
     """
     Generate plot dict with all calibration operations that only have to be performed once per trial.
@@ -721,6 +841,14 @@ def calibrate_visualization(model, nlp, name, options):
     plot_dict['variables'] = struct_op.strip_of_contents(model.variables)
     plot_dict['variables_dict'] = struct_op.strip_of_contents(model.variables_dict)
     plot_dict['scaling'] = model.scaling
+    get_variable_subkeys(plot_dict)
+
+    # factors from scaled to si values, reused by every recalibration
+    if nlp.discretization == 'direct_collocation':
+        d = nlp.d
+    else:
+        d = None
+    plot_dict['si_factors'] = struct_op.get_si_factors(plot_dict['variables'], plot_dict['scaling'], nlp.n_k, d, nlp.V)
 
     # wind information
     u_ref = model.options['params']['wind']['u_ref']
@@ -752,8 +880,12 @@ def recalibrate_visualization(V_plot, plot_dict, output_vals, integral_outputs_f
     plot_dict['cost'] = cost
 
     # add V_plot to dict
-    plot_dict['V_plot'] = struct_op.scaled_to_si(variables, scaling, n_k, d, V_plot)
-    plot_dict['V_ref'] = struct_op.scaled_to_si(variables, scaling, n_k, d, V_ref)
+    if 'si_factors' in plot_dict.keys():
+        plot_dict['V_plot'] = struct_op.scaled_to_si_with_factors(plot_dict['si_factors'], V_plot)
+        plot_dict['V_ref'] = struct_op.scaled_to_si_with_factors(plot_dict['si_factors'], V_ref)
+    else:
+        plot_dict['V_plot'] = struct_op.scaled_to_si(variables, scaling, n_k, d, V_plot)
+        plot_dict['V_ref'] = struct_op.scaled_to_si(variables, scaling, n_k, d, V_ref)
     # get new name
     plot_dict['name'] = name
 
@@ -798,14 +930,9 @@ def recalibrate_visualization(V_plot, plot_dict, output_vals, integral_outputs_f
     plot_dict['scale_axes'] = np.float(V_plot['xd', 0, 'l_t'])
 
 
-    dashes = []
-    for ldx in range(20):
-        new_dash = []
-        for jdx in range(4):
-            new_dash += [int(np.random.randint(1,6))]
-        new_dash += [1, 1]
-
-        dashes += [new_dash]
+    # random dash patterns, each followed by a short [1, 1] on-off pair
+    dash_core = np.random.randint(1, 6, size=(20, 4))
+    dashes = np.hstack([dash_core, np.ones((20, 2), dtype=int)]).tolist()
     plot_dict['dashes'] = dashes
 
     return plot_dict
@@ -827,6 +954,9 @@ def interpolate_data(plot_dict, cosmetics):
     integral_outputs = plot_dict['integral_outputs_final']
     nlp_options = plot_dict['options']['nlp']
     V_plot = plot_dict['V_plot']
+
+    # flatten the values once, all merged components are gathered from these
+    V_flat = get_flat_values(V_plot)
     if plot_dict['Collocation'] is not None:
         interpolator = plot_dict['Collocation'].build_interpolator(nlp_options, V_plot)
         int_interpolator = plot_dict['Collocation'].build_interpolator(nlp_options, V_plot, integral_outputs)
@@ -846,57 +976,67 @@ def interpolate_data(plot_dict, cosmetics):
     n_points = cosmetics['interpolation']['N']
 
     # xd-values
-    for name in list(struct_op.subkeys(variables_dict, 'xd')):
-        plot_dict['xd'][name] = []
-        for j in range(variables_dict['xd',name].shape[0]):
-            # merge values
-            values, time_grid = merge_xd_values(V_plot, name, j, plot_dict, cosmetics)
-            plot_dict['time_grids']['ip'] = np.linspace(time_grid[0], time_grid[-1], n_points)
-
-            # interpolate
-            if cosmetics['interpolation']['type'] == 'spline' or plot_dict['discretization'] == 'multiple_shooting':
-                values_ip = spline_interpolation(time_grid, values, plot_dict['time_grids']['ip'], n_points, name)
-            elif cosmetics['interpolation']['type'] == 'poly' and plot_dict['discretization'] == 'direct_collocation':
-                values_ip = interpolator(plot_dict['time_grids']['ip'], name, j, 'xd')
-            plot_dict['xd'][name] += [values_ip]
+    [variable_subkeys, algebraic_types] = get_variable_subkeys(plot_dict)
+    xd_names = variable_subkeys['xd']
+
+    # merge values
+    merged = {}
+    for name in xd_names:
+        [xd_values, time_grid] = merge_xd_values_all(V_plot, name, plot_dict, cosmetics, V_flat)
+        merged[name] = [(values, time_grid) for values in xd_values]
+
+    # all differential states are merged on the same time grid
+    plot_dict['time_grids']['ip'] = np.linspace(time_grid[0], time_grid[-1], n_points)
+
+    # interpolate all variables together
+    if cosmetics['interpolation']['type'] == 'spline' or plot_dict['discretization'] == 'multiple_shooting':
+        plot_dict['xd'] = interpolate_merged_values(merged, plot_dict['time_grids']['ip'], n_points, 'xd')
+    elif cosmetics['interpolation']['type'] == 'poly' and plot_dict['discretization'] == 'direct_collocation':
+        for name in xd_names:
+            plot_dict['xd'][name] = [interpolator(plot_dict['time_grids']['ip'], name, j, 'xd') for j in range(len(merged[name]))]
 
     # xa-values
-    for var_type in set(variables_dict.keys()) - set(['xd', 'u', 'xddot', 'theta']):
-        for name in list(struct_op.subkeys(variables_dict,var_type)):
-            plot_dict[var_type][name] = []
-            for j in range(variables_dict[var_type,name].shape[0]):
-                if plot_dict['discretization'] == 'direct_collocation':
-                    values_ip = interpolator(plot_dict['time_grids']['ip'], name, j, var_type)
-                else:
-                    values, time_grid = merge_xa_values(V_plot, var_type, name, j, plot_dict, cosmetics)
-                    # interpolate
-                    values_ip = spline_interpolation(time_grid, values, plot_dict['time_grids']['ip'], n_points, name)
-                plot_dict[var_type][name] += [values_ip]
+    for var_type in algebraic_types:
+        var_type_names = variable_subkeys[var_type]
+        if plot_dict['discretization'] == 'direct_collocation':
+            for name in var_type_names:
+                plot_dict[var_type][name] = [interpolator(plot_dict['time_grids']['ip'], name, j, var_type) for j in range(variables_dict[var_type,name].shape[0])]
+        else:
+            merged = {}
+            for name in var_type_names:
+                merged[name] = [merge_xa_values(V_plot, var_type, name, j, plot_dict, cosmetics, V_flat) for j in range(variables_dict[var_type,name].shape[0])]
+            # interpolate all variables together
+            plot_dict[var_type] = interpolate_merged_values(merged, plot_dict['time_grids']['ip'], n_points, var_type)
 
     # u-values
-    for name in list(struct_op.subkeys(variables_dict,'u')):
+    if u_param == 'zoh':
+        time_grids = plot_dict['time_grids']
+        hold_index = get_sample_and_hold_indices(time_grids)
+
+    for name in variable_subkeys['u']:
         plot_dict['u'][name] = []
         for j in range(variables_dict['u',name].shape[0]):
 
             if u_param == 'zoh':
                 control = plot_dict['V_plot']['u',:,name,j]
-                time_grids = plot_dict['time_grids']
-                values_ip = sample_and_hold_controls(time_grids, control)
+                values_ip = sample_and_hold_controls(time_grids, control, hold_index)
             elif u_param == 'poly':
                 values_ip = interpolator(plot_dict['time_grids']['ip'], name, j, 'u')
             plot_dict['u'][name] += [values_ip]
 
     # output values
+    merged = {}
+    if outputs_dict:
+        output_flat = get_flat_values(output_vals)
     for output_type in list(outputs_dict.keys()):
-        plot_dict['outputs'][output_type] = {}
+        # merge values
         for name in list(outputs_dict[output_type].keys()):
-            plot_dict['outputs'][output_type][name] = []
-            for j in range(outputs_dict[output_type][name].shape[0]):
-                # merge values
-                values, time_grid, ndim = merge_output_values(output_vals, output_type, name, j, plot_dict, cosmetics)
-                # inteprolate
-                values_ip = spline_interpolation(time_grid, values, plot_dict['time_grids']['ip'], n_points, name)
-                plot_dict['outputs'][output_type][name] += [values_ip]
+            merged[output_type, name] = [merge_output_values(output_vals, output_type, name, j, plot_dict, cosmetics, output_flat) for j in range(outputs_dict[output_type][name].shape[0])]
+
+    # interpolate the outputs of all types together
+    interpolated = interpolate_merged_values(merged, plot_dict['time_grids']['ip'], n_points, 'outputs')
+    for output_type in list(outputs_dict.keys()):
+        plot_dict['outputs'][output_type] = {name: interpolated[output_type, name] for name in outputs_dict[output_type].keys()}
 
     # integral outptus
     if plot_dict['discretization'] == 'direct_collocation':
@@ -921,6 +1061,19 @@ def interpolate_ref_data(plot_dict, cosmetics):
     outputs_dict = plot_dict['outputs_dict']
     output_vals = plot_dict['output_vals'][2]
     V_ref = plot_dict['V_ref']
+
+    # interpolating time grid
+    plot_dict['time_grids']['ref']['ip'] =  plot_dict['time_grids']['ip']
+    n_points = plot_dict['time_grids']['ip'].shape[0]
+
+    # reuse the previous interpolation if the reference did not change
+    ref_data_key = get_ref_data_key(plot_dict, cosmetics)
+    if 'ref' in plot_dict.keys() and plot_dict.get('ref_data_key') == ref_data_key:
+        return plot_dict
+
+    # flatten the values once, all merged components are gathered from these
+    V_flat = get_flat_values(V_ref)
+
     if plot_dict['Collocation'] is not None:
         interpolator = plot_dict['Collocation'].build_interpolator(nlp_options, V_ref)
         u_param = plot_dict['u_param']
@@ -930,77 +1083,125 @@ def interpolate_ref_data(plot_dict, cosmetics):
     # add states and outputs to plotting dict
     plot_dict['ref'] = {'xd': {},'u':{},'xa':{},'xl':{},'time_grids':{},'outputs':{}}
 
-    # interpolating time grid
-    plot_dict['time_grids']['ref']['ip'] =  plot_dict['time_grids']['ip']
-    n_points = plot_dict['time_grids']['ip'].shape[0]
-
     # xd-values
-    for name in list(struct_op.subkeys(variables_dict, 'xd')):
-        plot_dict['ref']['xd'][name] = []
-        for j in range(variables_dict['xd',name].shape[0]):
-            # merge values
-            values, time_grid = merge_xd_values(V_ref, name, j, plot_dict, cosmetics)
-
-            # interpolate
-            if cosmetics['interpolation']['type'] == 'spline' or plot_dict['discretization'] == 'multiple_shooting':
-                values_ip = spline_interpolation(time_grid, values, plot_dict['time_grids']['ref']['ip'], n_points, name)
-            elif cosmetics['interpolation']['type'] == 'poly' and plot_dict['discretization'] == 'direct_collocation':
-                values_ip = interpolator(plot_dict['time_grids']['ref']['ip'], name, j, 'xd')
-            plot_dict['ref']['xd'][name] += [values_ip]
+    [variable_subkeys, algebraic_types] = get_variable_subkeys(plot_dict)
+    xd_names = variable_subkeys['xd']
+
+    # interpolate all variables together
+    if cosmetics['interpolation']['type'] == 'spline' or plot_dict['discretization'] == 'multiple_shooting':
+        merged = {}
+        for name in xd_names:
+            [xd_values, time_grid] = merge_xd_values_all(V_ref, name, plot_dict, cosmetics, V_flat)
+            merged[name] = [(values, time_grid) for values in xd_values]
+        plot_dict['ref']['xd'] = interpolate_merged_values(merged, plot_dict['time_grids']['ref']['ip'], n_points, 'xd')
+    elif cosmetics['interpolation']['type'] == 'poly' and plot_dict['discretization'] == 'direct_collocation':
+        for name in xd_names:
+            plot_dict['ref']['xd'][name] = [interpolator(plot_dict['time_grids']['ref']['ip'], name, j, 'xd') for j in range(variables_dict['xd',name].shape[0])]
 
     # xa-values
-    for var_type in set(variables_dict.keys()) - set(['xd', 'u', 'xddot', 'theta']):
-        for name in list(struct_op.subkeys(variables_dict,var_type)):
-            plot_dict['ref'][var_type][name] = []
-            for j in range(variables_dict[var_type,name].shape[0]):
-                if plot_dict['discretization'] == 'direct_collocation':
-                    values_ip = interpolator(plot_dict['time_grids']['ref']['ip'], name, j, var_type)
-                else:
-                    values, time_grid = merge_xa_values(V_ref, var_type, name, j, plot_dict, cosmetics)
-                    # interpolate
-                    values_ip = spline_interpolation(time_grid, values, plot_dict['time_grids']['ref']['ip'], n_points, name)
-                plot_dict['ref'][var_type][name] += [values_ip]
+    for var_type in algebraic_types:
+        var_type_names = variable_subkeys[var_type]
+        if plot_dict['discretization'] == 'direct_collocation':
+            for name in var_type_names:
+                plot_dict['ref'][var_type][name] = [interpolator(plot_dict['time_grids']['ref']['ip'], name, j, var_type) for j in range(variables_dict[var_type,name].shape[0])]
+        else:
+            merged = {}
+            for name in var_type_names:
+                merged[name] = [merge_xa_values(V_ref, var_type, name, j, plot_dict, cosmetics, V_flat) for j in range(variables_dict[var_type,name].shape[0])]
+            # interpolate all variables together
+            plot_dict['ref'][var_type] = interpolate_merged_values(merged, plot_dict['time_grids']['ref']['ip'], n_points, var_type)
 
     # u-values
-    for name in list(struct_op.subkeys(variables_dict,'u')):
+    if u_param == 'zoh':
+        time_grids = plot_dict['time_grids']['ref']
+        hold_index = get_sample_and_hold_indices(time_grids)
+
+    for name in variable_subkeys['u']:
         plot_dict['ref']['u'][name] = []
         for j in range(variables_dict['u',name].shape[0]):
 
             if u_param == 'zoh':
                 control = plot_dict['V_ref']['u',:,name,j]
-                time_grids = plot_dict['time_grids']['ref']
-                values_ip = sample_and_hold_controls(time_grids, control)
+                values_ip = sample_and_hold_controls(time_grids, control, hold_index)
             elif u_param == 'poly':
                 values_ip = interpolator(plot_dict['time_grids']['ref']['ip'], name, j, 'u')
             plot_dict['ref']['u'][name] += [values_ip]
 
     # output values
+    merged = {}
+    if outputs_dict:
+        output_flat = get_flat_values(output_vals)
     for output_type in list(outputs_dict.keys()):
-        plot_dict['ref']['outputs'][output_type] = {}
+        # merge values
         for name in list(outputs_dict[output_type].keys()):
-            plot_dict['ref']['outputs'][output_type][name] = []
-            for j in range(outputs_dict[output_type][name].shape[0]):
-                # merge values
-                values, time_grid, ndim = merge_output_values(output_vals, output_type, name, j, plot_dict, cosmetics)
-                # inteprolate
-                values_ip = spline_interpolation(time_grid, values, plot_dict['time_grids']['ref']['ip'], n_points, name)
-                plot_dict['ref']['outputs'][output_type][name] += [values_ip]
+            merged[output_type, name] = [merge_output_values(output_vals, output_type, name, j, plot_dict, cosmetics, output_flat) for j in range(outputs_dict[output_type][name].shape[0])]
+
+    # interpolate the outputs of all types together
+    interpolated = interpolate_merged_values(merged, plot_dict['time_grids']['ref']['ip'], n_points, 'outputs')
+    for output_type in list(outputs_dict.keys()):
+        plot_dict['ref']['outputs'][output_type] = {name: interpolated[output_type, name] for name in outputs_dict[output_type].keys()}
+
+    plot_dict['ref_data_key'] = ref_data_key
 
     return plot_dict
 
+def get_ref_data_key(plot_dict, cosmetics):
+
+    # the reference interpolation only depends on the reference values, the time grids and the interpolation options
+    key_data = [plot_dict['V_ref'].cat, plot_dict['output_vals'][2].cat]
+    for time_grids in [plot_dict['time_grids'], plot_dict['time_grids']['ref']]:
+        for grid_name in sorted(time_grids.keys()):
+            if grid_name != 'ref':
+                key_data.append(time_grids[grid_name])
+    key_bytes = b''.join([np.array(cas.DM(data), dtype=float).tobytes() for data in key_data])
+
+    interpolation = cosmetics['interpolation']
+    return hash(key_bytes), interpolation['type'], interpolation['N'], cosmetics['plot_coll']
+
+
+def get_variable_subkeys(plot_dict):
 
-def sample_and_hold_controls(time_grids, control):
+    # the subkeys only depend on the variables structure, so they are collected once per plot dict
+    if not 'variable_subkeys' in plot_dict.keys():
+        variables_dict = plot_dict['variables']
+        plot_dict['variable_subkeys'] = {var_type: list(struct_op.subkeys(variables_dict, var_type)) for var_type in variables_dict.keys()}
+        plot_dict['algebraic_variable_types'] = [var_type for var_type in variables_dict.keys() if not var_type in ['xd', 'u', 'xddot', 'theta']]
 
-    tgrid_u = time_grids['u']
-    tgrid_ip = time_grids['ip']
-    values_ip = np.zeros(len(tgrid_ip),)
-    for index in range(len(tgrid_ip)):
-        for j in range(tgrid_u.shape[0] - 1):
-            if tgrid_u[j] < tgrid_ip[index] and tgrid_ip[index] < tgrid_u[j + 1]:
-                values_ip[index] = control[j]
-                break
-        if tgrid_u[-1] < tgrid_ip[index]:
-            values_ip[index] = control[-1]
+    return plot_dict['variable_subkeys'], plot_dict['algebraic_variable_types']
+
+def get_sample_and_hold_indices(time_grids):
+
+    tgrid_u = np.ravel(np.array(time_grids['u'], dtype=float))
+    tgrid_ip = np.ravel(np.array(time_grids['ip'], dtype=float))
+
+    n_u = tgrid_u.shape[0]
+    steps = np.diff(tgrid_u)
+
+    # each interpolation point holds the control of the last interval that started before it
+    if n_u > 1 and steps[0] > 0. and np.allclose(steps, steps[0]):
+        # uniform control grid: the interval index follows directly from the step size
+        interval_index = np.floor((tgrid_ip - tgrid_u[0]) / steps[0]).astype(int)
+        interval_index = np.clip(interval_index, 0, n_u - 1)
+
+        # correct for round-off at the interval boundaries
+        interval_index[tgrid_u[interval_index] > tgrid_ip] -= 1
+        upper_index = np.minimum(interval_index + 1, n_u - 1)
+        interval_index[(upper_index > interval_index) & (tgrid_u[upper_index] <= tgrid_ip)] += 1
+    else:
+        interval_index = np.searchsorted(tgrid_u, tgrid_ip, side='right') - 1
+
+    interval_index = np.clip(interval_index, 0, n_u - 1)
+
+    return interval_index
+
+def sample_and_hold_controls(time_grids, control, interval_index=None):
+
+    # the interval indices only depend on the time grids, so they can be computed once for all controls
+    if interval_index is None:
+        interval_index = get_sample_and_hold_indices(time_grids)
+
+    control = np.ravel(np.array(control, dtype=float))
+    values_ip = control[np.minimum(interval_index, control.shape[0] - 1)]
 
     return values_ip
 
@@ -1044,8 +1245,10 @@ def reconstruct_comparison_labels(plot_dict):
 
 def set_max_and_min(y_vals, y_max, y_min):
 
-    y_min = np.min([y_min, np.min(y_vals)])
-    y_max = np.max([y_max, np.max(y_vals)])
+    y_vals = np.asarray(y_vals, dtype=float)
+
+    y_min = min(y_min, float(y_vals.min()))
+    y_max = max(y_max, float(y_vals.max()))
 
     return y_max, y_min
 
@@ -1054,47 +1257,32 @@ def make_layer_plot_in_fig(layers, fig_num):
     nrows = len(layers)
     plt.figure(fig_num).clear()
     fig, axes = plt.subplots(nrows=nrows, ncols=1, sharex='all', num=fig_num)
+    # always return the axes as an array, also for a single layer
+    axes = np.atleast_1d(axes)
     return fig, axes, nrows
 
 def set_layer_plot_titles(axes, nrows, title):
-    if nrows == 1:
-        axes.set_title(title)
-    else:
-        axes[0].set_title(title)
+    axes[0].set_title(title)
     return axes
 
 def set_layer_plot_axes(axes, nrows, xlabel, ylabel, ldx = 0):
-    if nrows == 1:
-        axes.set_ylabel(ylabel)
-        axes.set_xlabel(xlabel)
-    else:
-        axes[ldx].set_ylabel(ylabel)
-        axes[ldx].set_xlabel(xlabel)
+    axes[ldx].set_ylabel(ylabel)
+    axes[ldx].set_xlabel(xlabel)
     return axes
 
 def set_layer_plot_legend(axes, nrows, ldx = 0):
-    if nrows == 1:
-        axes.legend()
-    else:
-        axes[ldx].legend()
+    axes[ldx].legend()
     return axes
 
 def set_layer_plot_scale(axes, nrows, x_min, x_max, y_min, y_max):
-    if nrows == 1:
-        axes.set_autoscale_on(False)
-        axes.axis([x_min, x_max, y_min, y_max])
-    else:
-        for idx in range(nrows):
-            axes[idx].set_autoscale_on(False)
-            axes[idx].axis([x_min, x_max, y_min, y_max])
+    for ax in axes:
+        ax.set_autoscale_on(False)
+        ax.axis([x_min, x_max, y_min, y_max])
     return axes
 
 def add_switching_time_epigraph(axes, nrows, tau, y_min, y_max):
-    if nrows == 1:
-        axes.plot([tau, tau], [y_min, y_max], 'k--')
-    else:
-        for idx in range(nrows):
-            axes[idx].plot([tau, tau], [y_min, y_max], 'k--')
+    for ax in axes:
+        ax.plot([tau, tau], [y_min, y_max], 'k--')
     return axes
 
 
@@ -1119,16 +1307,9 @@ def assemble_variable_slice_from_interpolated_data(plot_dict, index, var_type):
 
     else:
         local_dict = variables_dict[var_type]
-        collected_vals = []
-
-        for name in local_dict.keys():
-            column_vals = plot_dict[var_type][name]
-            # assume that all variables are saved in column format!!
-            n_entries = len(column_vals)
 
-            for edx in range(n_entries):
-                entry_val = column_vals[edx][index]
-                collected_vals = cas.vertcat(collected_vals, entry_val)
+        # assume that all variables are saved in column format!!
+        collected_vals = [float(entry_vals[index]) for name in local_dict.keys() for entry_vals in plot_dict[var_type][name]]
 
-        var_slice = local_dict(collected_vals)
+        var_slice = local_dict(cas.DM(collected_vals))
         return var_slice
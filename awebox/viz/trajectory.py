@@ -30,7 +30,6 @@ from matplotlib.ticker import MaxNLocator
 import numpy as np
 import awebox.viz.tools as tools
 import awebox.viz.wake as wake
-import casadi.tools as cas
 
 
 import matplotlib.animation as manimation
@@ -274,21 +273,17 @@ def plot_trajectory_instant(ax, ax2, plot_dict, index, cosmetics, side, init_col
         parent = parent_map[node]
 
         # construct local q
-        q_node = []
-        for j in range(3):
-            q_node = cas.vertcat(q_node, plot_dict['xd']['q'+str(node)+str(parent)][j][index])
+        q_node = tools.get_instant_components(plot_dict['xd']['q'+str(node)+str(parent)], index)
 
         # construct local parent
         if node == 1:
             q_parent = np.zeros((3, 1))
         else:
             grandparent = parent_map[parent]
-            q_parent = []
-            for j in range(3):
-                q_parent = cas.vertcat(q_parent, plot_dict['xd']['q'+str(parent)+str(grandparent)][j][index])
+            q_parent = tools.get_instant_components(plot_dict['xd']['q'+str(parent)+str(grandparent)], index)
 
         # stack node + parent vertically
-        vert_stack = cas.vertcat(q_node.T, q_parent.T)
+        vert_stack = np.vstack([q_node.T, q_parent.T])
 
         # plot tether
         tools.make_side_plot(ax, vert_stack, side, 'k')
@@ -305,18 +300,11 @@ def plot_trajectory_instant(ax, ax2, plot_dict, index, cosmetics, side, init_col
             parent = parent_map[kite]
 
             # kite position information
-            q_kite = []
-            for j in range(3):
-                q_kite = cas.vertcat(q_kite, plot_dict['xd']['q'+str(kite)+str(parent)][j][index])
+            q_kite = tools.get_instant_components(plot_dict['xd']['q'+str(kite)+str(parent)], index)
 
             # dcm information
-            r_dcm = []
-            for j in range(3):
-                r_dcm = cas.vertcat(r_dcm, plot_dict['outputs']['aerodynamics']['ehat_chord' + str(kite)][j][index])
-            for j in range(3):
-                r_dcm = cas.vertcat(r_dcm, plot_dict['outputs']['aerodynamics']['ehat_span' + str(kite)][j][index])
-            for j in range(3):
-                r_dcm = cas.vertcat(r_dcm, plot_dict['outputs']['aerodynamics']['ehat_up' + str(kite)][j][index])
+            aero_outputs = plot_dict['outputs']['aerodynamics']
+            r_dcm = np.vstack([tools.get_instant_components(aero_outputs[ehat + str(kite)], index) for ehat in ['ehat_chord', 'ehat_span', 'ehat_up']])
 
             # draw kite body
             tools.draw_kite(ax, q_kite, r_dcm, options['model'], local_color, side, num_per_meter)
@@ -4,6 +4,8 @@ import awebox.mdl.aero.tether_dir.frames as frames
 def test_aero_comp():
 
     biot_savart.test_filament()
+    biot_savart.test_filament_against_quadrature()
+    biot_savart.test_filament_np()
 
     frames.test_transforms()
 